@@ -1,53 +1,47 @@
 from flask import Flask, render_template, Response, jsonify
 from flask_cors import CORS
 import cv2
-import numpy as np
-from room_detector import RoomDetector
+from detector_manager import DetectorManager
 import threading
 import time
-import json
 from flask_socketio import SocketIO, emit
 
 app = Flask(__name__)
 CORS(app)
 socketio = SocketIO(app, cors_allowed_origins="*")
 
-# Global detector instance
-detector = None
-detector_thread = None
-is_running = False
+# The detector (and its model) is created once and kept warm across start/stop/restart
+manager = None
+manager_lock = threading.Lock()
+analysis_thread = None
+
+def get_manager():
+    global manager
+    with manager_lock:
+        if manager is None:
+            manager = DetectorManager()
+        return manager
 
 def generate_frames():
     """Generate video frames for streaming"""
-    global detector, is_running
+    detector = get_manager().detector
     
-    while is_running:
-        if detector and detector.cap is not None:
-            ret, frame = detector.cap.read()
-            if not ret:
-                break
-                
-            # Process frame
-            detections = detector.process_frame(frame)
-            frame = detector.draw_detections(frame, detections)
-            
-            # Convert frame to JPEG
+    while get_manager().is_running():
+        # Frames are read and annotated by the detection thread; the stream only encodes the latest one
+        frame = detector.get_latest_frame()
+        if frame is not None:
             ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
+            if ret:
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
             
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
-            
-        time.sleep(0.01)  # Small delay to prevent CPU overload
+        time.sleep(1 / 30)  # Don't stream faster than the camera delivers
 
 def emit_room_analysis():
     """Emit room analysis updates via WebSocket"""
-    global detector, is_running
-    
-    while is_running:
-        if detector:
-            analysis = detector.get_room_analysis()
-            socketio.emit('room_analysis', analysis)
+    while True:
+        if manager is not None and manager.is_running():
+            socketio.emit('room_analysis', manager.detector.get_room_analysis())
         time.sleep(1)  # Update every second
 
 @app.route('/')
@@ -64,53 +58,49 @@ def video_feed():
 @app.route('/start_detection')
 def start_detection():
     """Start the room detection"""
-    global detector, detector_thread, is_running
+    global analysis_thread
     
-    if not is_running:
-        detector = RoomDetector(device='auto')
-        is_running = True
-        
-        # Start detection thread
-        detector_thread = threading.Thread(target=detector.run)
-        detector_thread.start()
-        
-        # Start analysis emission thread
-        analysis_thread = threading.Thread(target=emit_room_analysis)
-        analysis_thread.daemon = True
-        analysis_thread.start()
-        
+    if get_manager().start():
+        # One emitter thread serves every run
+        if analysis_thread is None:
+            analysis_thread = threading.Thread(target=emit_room_analysis)
+            analysis_thread.daemon = True
+            analysis_thread.start()
         return jsonify({'status': 'success', 'message': 'Detection started'})
     return jsonify({'status': 'error', 'message': 'Detection already running'})
 
 @app.route('/stop_detection')
 def stop_detection():
     """Stop the room detection"""
-    global detector, is_running
-    
-    if is_running:
-        is_running = False
-        if detector:
-            detector.is_running = False
-            if detector.cap is not None:
-                detector.cap.release()
+    if not get_manager().is_running():
+        return jsonify({'status': 'error', 'message': 'Detection not running'})
+    if get_manager().stop():
         return jsonify({'status': 'success', 'message': 'Detection stopped'})
-    return jsonify({'status': 'error', 'message': 'Detection not running'})
+    return jsonify({'status': 'error', 'message': 'Detection is still stopping'}), 503
+
+@app.route('/restart_detection')
+def restart_detection():
+    """Restart the room detection with the already loaded model"""
+    if get_manager().restart():
+        return jsonify({'status': 'success', 'message': 'Detection restarted',
+                        'restart_ms': get_manager().last_restart_ms})
+    return jsonify({'status': 'error', 'message': 'Previous detection is still stopping'}), 503
+
+@app.route('/health')
+def health():
+    """Lifecycle and camera state of the detector"""
+    health = get_manager().health()
+    return jsonify(health), 200 if health['healthy'] else 503
 
 @app.route('/get_metrics')
 def get_metrics():
     """Get current performance metrics"""
-    global detector
-    if detector:
-        return jsonify(detector.get_performance_metrics())
-    return jsonify({'status': 'error', 'message': 'Detector not initialized'})
+    return jsonify(get_manager().detector.get_performance_metrics())
 
 @app.route('/get_room_analysis')
 def get_room_analysis():
     """Get current room analysis"""
-    global detector
-    if detector:
-        return jsonify(detector.get_room_analysis())
-    return jsonify({'status': 'error', 'message': 'Detector not initialized'})
+    return jsonify(get_manager().detector.get_room_analysis())
 
 @socketio.on('connect')
 def handle_connect():
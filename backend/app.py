@@ -1,40 +1,170 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+from quart import Quart, Response, request, jsonify
+from quart_cors import cors
 from dotenv import load_dotenv
+import asyncio
 import os
-from model.recommender import TravelRecommender
+import threading
+import time
+from model.recommender import TravelRecommender, WEATHER_BUCKETS
 from utils.weather import get_weather_data
 from utils.location import get_location_data
+from utils.async_io import run_blocking, resolve_location_and_weather, resolve_many
+from utils.cache import TTLCache, EncodedResponse
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app)
+# Quart is served over ASGI, so a request awaiting an upstream lookup doesn't hold a worker
+app = cors(Quart(__name__))
 
 # Initialize the recommender system
 recommender = TravelRecommender()
 
+# Recommendations are deterministic for (preferences, season, weather bucket), so
+# responses are cached already encoded. Keys carry the catalog version so that
+# nothing computed from an old catalog is served after a reload.
+response_cache = TTLCache(max_entries=1024, ttl=3600, track_popularity=True)
+candidate_cache = TTLCache(max_entries=64, ttl=3600)
+CACHE_REFRESH_INTERVAL = 300  # seconds between background refreshes
+CACHE_WARM_TOP = 50  # most requested keys to keep precomputed
+
+def preference_key(user_preferences):
+    return ('preferred_type' in user_preferences, user_preferences.get('preferred_type'))
+
+def get_candidates(user_preferences):
+    """Prefiltered catalog for normalized preferences, computed once per season"""
+    key = (recommender.catalog_version, recommender.current_season(), preference_key(user_preferences))
+    candidates = candidate_cache.get(key)
+    if candidates is None:
+        candidates = candidate_cache.put(key, recommender.prefilter_destinations(user_preferences))
+    return candidates
+
+def get_cached_recommendations(user_preferences, weather_bucket, refresh=False):
+    """Encoded recommendations response for a request, from the cache when possible"""
+    preferences = recommender.normalize_preferences(user_preferences)
+    key = (recommender.catalog_version, preference_key(preferences),
+           recommender.current_season(), weather_bucket)
+    
+    entry = None if refresh else response_cache.get(key)
+    if entry is None:
+        recommendations = recommender.get_bucket_recommendations(
+            preferences, weather_bucket, candidates=get_candidates(preferences)
+        )
+        entry = response_cache.put(key, EncodedResponse({
+            'status': 'success',
+            'recommendations': recommendations
+        }))
+    return entry
+
+def encoded_response(entry, conditional=False):
+    # Only GET lookups are revalidated; a POST must never be answered with 304
+    if conditional and entry.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, mimetype='application/json')
+    if conditional:
+        response.set_etag(entry.etag)
+    return response
+
+def popular_preferences():
+    """Preference keys of the most requested responses"""
+    return [key[1] for key in response_cache.popular_keys(CACHE_WARM_TOP)]
+
+def warm_cache(popular=None):
+    """Precompute the popular (preferences, weather bucket) combinations for the current season"""
+    popular = list(popular_preferences() if popular is None else popular)
+    popular.append((False, None))  # No stated preference
+    
+    for has_type, preferred_type in set(popular):
+        user_preferences = {'preferred_type': preferred_type} if has_type else {}
+        for weather_bucket in WEATHER_BUCKETS:
+            get_cached_recommendations(user_preferences, weather_bucket, refresh=True)
+
+def _cache_warmer():
+    while True:
+        try:
+            warm_cache()
+        except Exception as e:
+            print(f"Error warming recommendation cache: {str(e)}")
+        time.sleep(CACHE_REFRESH_INTERVAL)
+
+threading.Thread(target=_cache_warmer, daemon=True).start()
+
+async def lookup_recommendations(user_preferences, location):
+    # Fetch the weather (geocoding first if needed) and prefilter the catalog concurrently
+    (_, weather_data), _ = await asyncio.gather(
+        resolve_location_and_weather(location),
+        run_blocking(get_candidates, recommender.normalize_preferences(user_preferences))
+    )
+    return get_cached_recommendations(user_preferences, recommender.weather_bucket(weather_data))
+
 @app.route('/api/recommendations', methods=['POST'])
-def get_recommendations():
+async def get_recommendations():
+    try:
+        data = await request.get_json()
+        entry = await lookup_recommendations(data.get('preferences', {}), data.get('location', {}))
+        return encoded_response(entry)
+    
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/recommendations', methods=['GET'])
+async def get_recommendations_conditional():
+    """
+    Same lookup as the POST form, from query parameters (preferred_type, lat, lon, address),
+    so clients and HTTP caches can revalidate it with If-None-Match
+    """
+    try:
+        user_preferences = {}
+        if 'preferred_type' in request.args:
+            user_preferences['preferred_type'] = request.args['preferred_type']
+        location = {name: request.args[name] for name in ('lat', 'lon', 'address') if name in request.args}
+        
+        entry = await lookup_recommendations(user_preferences, location)
+        return encoded_response(entry, conditional=True)
+    
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/recommendations/batch', methods=['POST'])
+async def get_batch_recommendations():
     try:
-        data = request.json
-        user_preferences = data.get('preferences', {})
-        location = data.get('location', {})
+        data = await request.get_json()
+        items = data.get('requests', [])
         
-        # Get weather data for the location
-        weather_data = get_weather_data(location.get('lat'), location.get('lon'))
+        if not isinstance(items, list):
+            return jsonify({
+                'status': 'error',
+                'message': 'requests must be a list of {preferences, location} objects'
+            }), 400
+        
+        preferences = [item.get('preferences', {}) for item in items]
         
-        # Get recommendations
-        recommendations = recommender.get_recommendations(
-            user_preferences=user_preferences,
-            weather_data=weather_data,
-            location=location
+        # Candidates only depend on the preferred type, so prefilter each distinct one once
+        distinct = {}
+        for user_preferences in preferences:
+            normalized = recommender.normalize_preferences(user_preferences)
+            distinct[preference_key(normalized)] = normalized
+        
+        resolved, _ = await asyncio.gather(
+            resolve_many([item.get('location', {}) for item in items]),
+            asyncio.gather(*(run_blocking(get_candidates, prefs) for prefs in distinct.values()))
         )
         
+        results = []
+        for user_preferences, (location, weather_data) in zip(preferences, resolved):
+            entry = get_cached_recommendations(user_preferences, recommender.weather_bucket(weather_data))
+            results.append(entry.payload['recommendations'])
+        
         return jsonify({
             'status': 'success',
-            'recommendations': recommendations
+            'results': results
         })
     
     except Exception as e:
@@ -43,8 +173,37 @@ def get_recommendations():
             'message': str(e)
         }), 500
 
+@app.route('/api/catalog/reload', methods=['POST'])
+def reload_catalog():
+    try:
+        # Request counts are reset with the cache, so carry the popular preferences over
+        popular = popular_preferences()
+        recommender.reload_destinations()
+        response_cache.clear()
+        candidate_cache.clear()
+        warm_cache(popular)
+        
+        return jsonify({
+            'status': 'success',
+            'catalog_version': recommender.catalog_version
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    return jsonify({
+        'status': 'success',
+        'responses': response_cache.stats(),
+        'candidates': candidate_cache.stats()
+    })
+
 @app.route('/api/weather', methods=['GET'])
-def get_weather():
+async def get_weather():
     try:
         lat = request.args.get('lat')
         lon = request.args.get('lon')
@@ -55,7 +214,7 @@ def get_weather():
                 'message': 'Latitude and longitude are required'
             }), 400
             
-        weather_data = get_weather_data(lat, lon)
+        weather_data = await run_blocking(get_weather_data, lat, lon)
         return jsonify({
             'status': 'success',
             'weather': weather_data
@@ -3,12 +3,22 @@ from sklearn.metrics.pairwise import cosine_similarity
 import pandas as pd
 from datetime import datetime
 
+# Coarse weather buckets; every weather report in a bucket scores identically
+WEATHER_BUCKETS = ['unknown', 'mild-fair', 'mild-poor', 'extreme-fair', 'extreme-poor']
+
 class TravelRecommender:
     def __init__(self):
         # Initialize with sample data (in production, this would be loaded from a database)
         self.destinations = self._load_sample_destinations()
+        self.catalog_version = 0
         self.user_preferences = {}
         
+    def reload_destinations(self):
+        """Reload the destination catalog; results cached for older versions become stale"""
+        self.destinations = self._load_sample_destinations()
+        self.catalog_version += 1
+        
+
     def _load_sample_destinations(self):
         # Sample destination data with features
         return pd.DataFrame([
@@ -44,58 +54,102 @@ class TravelRecommender:
             }
         ])
     
-    def _calculate_season_score(self, destination, current_weather):
-        # Calculate how suitable the destination is for the current season
+    @staticmethod
+    def current_season():
         current_month = datetime.now().month
-        season = 'winter' if current_month in [12, 1, 2] else \
+        return 'winter' if current_month in [12, 1, 2] else \
                 'spring' if current_month in [3, 4, 5] else \
                 'summer' if current_month in [6, 7, 8] else 'fall'
+    
+    @staticmethod
+    def weather_bucket(weather_data):
+        """Reduce a weather report to the coarse bucket the scoring depends on"""
+        if not weather_data:
+            return 'unknown'
+            
+        temp = weather_data.get('temperature', 20)
+        conditions = weather_data.get('conditions', 'clear')
+        
+        temp_label = 'mild' if 15 <= temp <= 30 else 'extreme'
+        conditions_label = 'fair' if conditions in ['clear', 'partly_cloudy'] else 'poor'
+        return f"{temp_label}-{conditions_label}"
+    
+    def _calculate_season_score(self, destination, current_weather):
+        # Calculate how suitable the destination is for the current season
+        season = self.current_season()
         
         return 1.0 if destination['best_season'] == season else 0.5
     
-    def _calculate_weather_score(self, destination, weather_data):
+    def _calculate_weather_score(self, destination, weather_bucket):
         # Calculate weather compatibility score
-        if not weather_data:
+        if weather_bucket == 'unknown':
             return 0.5
             
-        temp = weather_data.get('temperature', 20)
-        conditions = weather_data.get('conditions', 'clear')
+        temp_label, conditions_label = weather_bucket.split('-')
         
         # Simple scoring based on temperature and conditions
-        temp_score = 1.0 if 15 <= temp <= 30 else 0.5
-        conditions_score = 1.0 if conditions in ['clear', 'partly_cloudy'] else 0.7
+        temp_score = 1.0 if temp_label == 'mild' else 0.5
+        conditions_score = 1.0 if conditions_label == 'fair' else 0.7
         
         return (temp_score + conditions_score) / 2
     
-    def get_recommendations(self, user_preferences, weather_data, location):
-        # Update user preferences
-        self.user_preferences.update(user_preferences)
-        
-        # Calculate scores for each destination
-        scores = []
+    def normalize_preferences(self, user_preferences):
+        """Reduce preferences to what the scoring uses; types outside the catalog all score alike"""
+        if 'preferred_type' not in user_preferences:
+            return {}
+            
+        preferred_type = user_preferences['preferred_type']
+        if not isinstance(preferred_type, str) or preferred_type not in set(self.destinations['type']):
+            preferred_type = None
+        return {'preferred_type': preferred_type}
+    
+    def prefilter_destinations(self, user_preferences):
+        """Pre-score every destination on the parts that don't depend on the weather"""
+        candidates = []
         for _, destination in self.destinations.iterrows():
-            # Calculate various scores
-            season_score = self._calculate_season_score(destination, weather_data)
-            weather_score = self._calculate_weather_score(destination, weather_data)
+            season_score = self._calculate_season_score(destination, None)
             
             # Calculate preference match score
             preference_score = 0.5  # Default score
             if 'preferred_type' in user_preferences:
                 preference_score = 1.0 if user_preferences['preferred_type'] == destination['type'] else 0.3
             
-            # Calculate final score
-            final_score = (
+            partial_score = (
                 season_score * 0.3 +
-                weather_score * 0.3 +
                 preference_score * 0.2 +
                 destination['popularity'] * 0.2
             )
+            candidates.append((destination.to_dict(), partial_score))
+        
+        return candidates
+    
+    def get_recommendations(self, user_preferences, weather_data, location, candidates=None):
+        # Update user preferences
+        self.user_preferences.update(user_preferences)
+        
+        return self.get_bucket_recommendations(
+            user_preferences, self.weather_bucket(weather_data), candidates=candidates
+        )
+    
+    def get_bucket_recommendations(self, user_preferences, weather_bucket, candidates=None):
+        """Recommendations for a coarse weather bucket (deterministic for a given season)"""
+        # Candidates can be prefiltered ahead of time, e.g. while the weather is still being fetched
+        if candidates is None:
+            candidates = self.prefilter_destinations(user_preferences)
+        
+        # Calculate scores for each destination
+        scores = []
+        for destination, partial_score in candidates:
+            weather_score = self._calculate_weather_score(destination, weather_bucket)
+            
+            # Calculate final score
+            final_score = partial_score + weather_score * 0.3
             
             scores.append({
-                'destination': destination.to_dict(),
+                'destination': destination,
                 'score': final_score
             })
         
         # Sort by score and return top recommendations
         recommendations = sorted(scores, key=lambda x: x['score'], reverse=True)
-        return recommendations[:5]  # Return top 5 recommendations 
\ No newline at end of file
+        return recommendations[:5]  # Return top 5 recommendations
\ No newline at end of file
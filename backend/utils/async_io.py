@@ -0,0 +1,103 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from utils.weather import get_weather_data
+from utils.location import get_location_data
+from utils.cache import TTLCache
+
+# The upstream clients (requests, geopy) are blocking, so they run on a shared
+# pool that lives as long as the worker instead of one thread per request,
+# while the event loop keeps serving other requests.
+_io_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix='upstream-io')
+
+# Coordinates are rounded to ~1 km before fetching the weather so that nearby
+# requests in a batch share a single upstream call
+COORD_PRECISION = 2
+
+# Weather changes slowly compared to the request rate, so recent lookups are reused
+_weather_cache = TTLCache(max_entries=4096, ttl=600)
+
+# Addresses don't move, and Nominatim is rate limited, so geocodes are kept for a day
+_location_cache = TTLCache(max_entries=4096, ttl=86400)
+
+async def run_blocking(func, *args):
+    """Run a blocking call on the shared I/O pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, func, *args)
+
+def weather_key(location):
+    """Normalized (lat, lon) key used to share weather lookups"""
+    lat, lon = location.get('lat'), location.get('lon')
+    if lat is None or lon is None:
+        return None
+    return (round(float(lat), COORD_PRECISION), round(float(lon), COORD_PRECISION))
+
+def address_key(location):
+    """Normalized address key used to share geocoding lookups"""
+    address = location.get('address')
+    if not address:
+        return None
+    return ' '.join(address.lower().split())
+
+async def fetch_weather(key):
+    if key is None:
+        return None
+    
+    weather_data = _weather_cache.get(key)
+    if weather_data is None:
+        weather_data = await run_blocking(get_weather_data, *key)
+        # Failed lookups are not cached so they get retried
+        if weather_data is not None:
+            _weather_cache.put(key, weather_data)
+    return weather_data
+
+async def fetch_location(address):
+    key = address_key({'address': address})
+    if key is None:
+        return None
+    
+    geocoded = _location_cache.get(key)
+    if geocoded is None:
+        geocoded = await run_blocking(get_location_data, address)
+        if geocoded is not None:
+            _location_cache.put(key, geocoded)
+    return geocoded
+
+async def resolve_location_and_weather(location):
+    """
+    Fetch the weather for a single location, geocoding the address first
+    only when the request doesn't carry coordinates.
+    """
+    location = dict(location)
+    if weather_key(location) is None:
+        geocoded = await fetch_location(location.get('address'))
+        if geocoded:
+            location.update(geocoded)
+    weather_data = await fetch_weather(weather_key(location))
+    return location, weather_data
+
+async def resolve_many(locations):
+    """
+    Resolve a batch of locations, issuing each distinct geocoding and weather
+    lookup only once no matter how many entries in the batch share it.
+    """
+    locations = [dict(location) for location in locations]
+
+    # Geocode every distinct address that we still need coordinates for
+    addresses = {address_key(loc) for loc in locations if weather_key(loc) is None}
+    addresses.discard(None)
+    addresses = list(addresses)
+    geocoded = await asyncio.gather(*(fetch_location(address) for address in addresses))
+    geocoded = dict(zip(addresses, geocoded))
+
+    for location in locations:
+        if weather_key(location) is None and geocoded.get(address_key(location)):
+            location.update(geocoded[address_key(location)])
+
+    # Fetch the weather for every distinct coordinate bucket
+    keys = {weather_key(loc) for loc in locations}
+    keys.discard(None)
+    keys = list(keys)
+    weather = await asyncio.gather(*(fetch_weather(key) for key in keys))
+    weather = dict(zip(keys, weather))
+
+    return [(location, weather.get(weather_key(location))) for location in locations]
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter, OrderedDict
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, max_entries=1024, ttl=600, track_popularity=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.track_popularity = track_popularity
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        # Request counts per key, used to decide what to precompute
+        self.key_counts = Counter()
+
+    def get(self, key):
+        with self._lock:
+            if self.track_popularity:
+                self.key_counts[key] += 1
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.key_counts.clear()
+
+    def popular_keys(self, n):
+        """The `n` most requested keys"""
+        with self._lock:
+            return [key for key, _ in self.key_counts.most_common(n)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+class EncodedResponse:
+    """A JSON payload serialized once, together with its ETag"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(self.body).hexdigest()
@@ -14,7 +14,7 @@ def get_weather_data(lat, lon):
         
     try:
         url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-        response = requests.get(url)
+        response = requests.get(url, timeout=10)
         data = response.json()
         
         if response.status_code == 200:
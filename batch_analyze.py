@@ -0,0 +1,320 @@
+import argparse
+import json
+import math
+import os
+import sys
+import cv2
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tqdm import tqdm
+from room_detector import RoomDetector
+from frame_sources import VideoFileSource, IMAGE_EXTENSIONS
+from frame_clock import ReplayClock
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.m4v')
+
+# Every result record has these fields (None where they don't apply); nested values are stored as JSON in Parquet
+RECORD_FIELDS = {
+    'key': 'string', 'source': 'string', 'type': 'string',
+    'window_start': 'float64', 'window_end': 'float64', 'frames': 'int64',
+    'height': 'int64', 'width': 'int64', 'detections': 'json',
+    'room_type': 'string', 'object_counts': 'json', 'suggestions': 'json', 'warnings': 'json',
+    'error': 'string'
+}
+
+def collect_inputs(paths):
+    """Expand the command-line paths (folders, image/video files, .txt lists of files) into (images, videos)"""
+    images, videos = [], []
+
+    def add(path):
+        suffix = path.suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            images.append(path)
+        elif suffix in VIDEO_EXTENSIONS:
+            videos.append(path)
+
+    for path in map(Path, paths):
+        if path.is_dir():
+            for file_path in sorted(path.rglob('*')):
+                add(file_path)
+        elif path.suffix.lower() == '.txt':
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        add(Path(line.strip()))
+        else:
+            add(path)
+    return images, videos
+
+def prefetch(func, items, workers, depth):
+    """Yield (item, func(item)) in order, keeping at most `depth` calls in flight on a thread pool"""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append((item, pool.submit(func, item)))
+            if len(pending) >= depth:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+
+class JsonlWriter:
+    """Appends records to a JSON Lines file"""
+
+    def __init__(self, path):
+        self.file = open(path, 'a')
+
+    def write(self, records):
+        for record in records:
+            self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class ParquetWriter:
+    """Writes each flushed batch of records as a new part file in a directory"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Parquet output needs pyarrow: pip install pyarrow")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.part = len(list(self.path.glob('part-*.parquet')))
+        self.schema = pyarrow.schema([
+            (name, pyarrow.string() if kind == 'json' else getattr(pyarrow, kind)())
+            for name, kind in RECORD_FIELDS.items()
+        ])
+
+    def write(self, records):
+        # Nested fields are stored as JSON strings to keep one flat schema across parts
+        rows = [{name: json.dumps(record[name]) if kind == 'json' and record[name] is not None else record[name]
+                 for name, kind in RECORD_FIELDS.items()} for record in records]
+        table = self.pa.Table.from_pylist(rows, schema=self.schema)
+        self.pq.write_table(table, self.path / f"part-{self.part:05d}.parquet")
+        self.part += 1
+
+    def close(self):
+        pass
+
+class Checkpoint:
+    """Keys of the work units whose results have been written, appended to a text file"""
+
+    def __init__(self, path, resume=True):
+        self.path = Path(path)
+        self.done = set()
+        if resume and self.path.exists():
+            with open(self.path) as f:
+                self.done = {line.rstrip('\n') for line in f if line.strip()}
+        self.file = open(self.path, 'a' if resume else 'w')
+
+    def mark(self, keys):
+        for key in keys:
+            self.file.write(key + '\n')
+            self.done.add(key)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+class BatchAnalyzer:
+    """Runs batched detection and room analysis over images and video windows, streaming the results out"""
+
+    def __init__(self, detector, writer, checkpoint, batch_size=16, flush_every=100):
+        self.detector = detector
+        self.analyzer = detector.room_analyzer
+        # Set to the recording time of each unit, so time-of-day suggestions match the footage
+        self.clock = ReplayClock()
+        self.analyzer.clock = self.clock
+        self.writer = writer
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.flush_every = flush_every
+        self._records = []
+        self._keys = []
+
+    def _emit(self, key, record):
+        self._records.append({field: record.get(field) for field in RECORD_FIELDS})
+        self._keys.append(key)
+        if len(self._records) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Write buffered results, then checkpoint them (a crash in between only causes duplicates)"""
+        if self._records:
+            self.writer.write(self._records)
+            self.checkpoint.mark(self._keys)
+        self._records, self._keys = [], []
+
+    def _analyze(self, detections_per_frame, timestamp):
+        self.clock.on_frame(timestamp)
+        
+        # Count instances per frame and keep the largest count seen in the unit
+        object_counts = Counter()
+        confidence_scores = {}
+        for detections in detections_per_frame:
+            frame_counts = Counter(d['name'] for d in detections)
+            for name, count in frame_counts.items():
+                object_counts[name] = max(object_counts[name], count)
+            for d in detections:
+                confidence_scores[d['name']] = max(d['confidence'], confidence_scores.get(d['name'], 0.0))
+
+        detected_objects = [name for name, count in object_counts.items() for _ in range(count)]
+        return self.analyzer.analyze_room(detected_objects, confidence_scores, object_counts)
+
+    def _record(self, key, source, analysis, **fields):
+        record = {'key': key, 'source': source}
+        record.update(fields)
+        record.update({
+            'room_type': analysis['room_type'],
+            'object_counts': analysis['object_counts'],
+            'suggestions': analysis['suggestions'],
+            'warnings': analysis['warnings']
+        })
+        return record
+
+    def run_images(self, images, readers, progress):
+        pending = [path for path in images if str(path) not in self.checkpoint.done]
+        progress.update(len(images) - len(pending))
+
+        batch = []
+        for path, frame in prefetch(lambda p: cv2.imread(str(p)), pending, readers, readers * self.batch_size):
+            if frame is None:
+                self._emit(str(path), {'key': str(path), 'source': str(path), 'type': 'image',
+                                       'error': 'unreadable image'})
+                progress.update(1)
+                continue
+            batch.append((path, frame))
+            if len(batch) >= self.batch_size:
+                self._run_image_batch(batch, progress)
+                batch = []
+        if batch:
+            self._run_image_batch(batch, progress)
+
+    def _run_image_batch(self, batch, progress):
+        for (path, frame), detections in zip(batch, self.detector.detect_batch([frame for _, frame in batch])):
+            analysis = self._analyze([detections], os.path.getmtime(path))
+            record = self._record(str(path), str(path), analysis, type='image', frames=1,
+                                  height=frame.shape[0], width=frame.shape[1], detections=detections)
+            self._emit(str(path), record)
+        progress.update(len(batch))
+
+    def run_video(self, path, window, sample_fps, progress):
+        """Analyze a video in windows of `window` seconds, sampled at sample_fps"""
+        if str(path) in self.checkpoint.done:
+            return
+
+        try:
+            source = VideoFileSource(str(path), sample_fps=sample_fps)
+        except IOError as e:
+            # Recorded and checkpointed like an unreadable image, so a resume doesn't trip over it again
+            self._emit(str(path), {'key': str(path), 'source': str(path), 'type': 'video', 'error': str(e)})
+            self.flush()
+            return
+        
+        window_frames = {}  # window index -> detections of each sampled frame
+
+        def finish(index):
+            key = f"{path}@{index * window}"
+            detections_per_frame = window_frames.pop(index)
+            if key in self.checkpoint.done:
+                return
+            analysis = self._analyze(detections_per_frame, source.start_time + index * window)
+            self._emit(key, self._record(key, str(path), analysis, type='video',
+                                         window_start=index * window, window_end=(index + 1) * window,
+                                         frames=len(detections_per_frame)))
+
+        try:
+            batch = []
+            while True:
+                ret, frame = source.read()
+                if ret:
+                    batch.append((int(source.timestamp // window), frame))
+                if batch and (len(batch) >= self.batch_size or not ret):
+                    detections = self.detector.detect_batch([frame for _, frame in batch])
+                    for (index, _), frame_detections in zip(batch, detections):
+                        window_frames.setdefault(index, []).append(frame_detections)
+                    progress.update(len(batch))
+                    batch = []
+
+                    # Windows before the latest one are complete
+                    latest = max(window_frames)
+                    for index in sorted(window_frames):
+                        if index < latest:
+                            finish(index)
+                if not ret:
+                    break
+        finally:
+            source.release()
+
+        for index in sorted(window_frames):
+            finish(index)
+
+        # The whole video is only checkpointed once all of its windows are written
+        self.flush()
+        self.checkpoint.mark([str(path)])
+
+def video_sample_count(path, sample_fps):
+    cap = cv2.VideoCapture(str(path))
+    frames, fps = cap.get(cv2.CAP_PROP_FRAME_COUNT), cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+    # Frames 0, step, 2 * step, ... are sampled
+    return math.ceil(frames / max(1, round(fps / sample_fps)))
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline room analysis of image folders and video archives')
+    parser.add_argument('inputs', nargs='+', help='Image folders, image or video files, or .txt lists of files')
+    parser.add_argument('--output', default='analysis.jsonl',
+                        help='Results file (.jsonl) or directory of part files (.parquet)')
+    parser.add_argument('--model', default='yolov8n.pt', help='Detection model')
+    parser.add_argument('--conf', type=float, default=0.5, help='Confidence threshold')
+    parser.add_argument('--batch-size', type=int, default=16, help='Frames per inference batch')
+    parser.add_argument('--readers', type=int, default=min(8, os.cpu_count() or 1), help='Image decoding threads')
+    parser.add_argument('--window', type=float, default=60.0, help='Seconds of video per analysis')
+    parser.add_argument('--sample-fps', type=float, default=1.0, help='Video frames analyzed per second')
+    parser.add_argument('--flush-every', type=int, default=100, help='Results buffered before each write')
+    parser.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start over')
+    args = parser.parse_args()
+
+    images, videos = collect_inputs(args.inputs)
+    if not images and not videos:
+        print("No images or videos found")
+        sys.exit(1)
+
+    output = Path(args.output)
+    if args.restart:
+        if output.is_file():
+            output.unlink()
+        elif output.is_dir():
+            for part in output.glob('part-*.parquet'):
+                part.unlink()
+    writer = ParquetWriter(output) if output.suffix == '.parquet' else JsonlWriter(output)
+    checkpoint = Checkpoint(str(output) + '.checkpoint', resume=not args.restart)
+
+    detector = RoomDetector(model_path=args.model, confidence_threshold=args.conf, display=False)
+    batch_analyzer = BatchAnalyzer(detector, writer, checkpoint, args.batch_size, args.flush_every)
+
+    total = len(images) + sum(video_sample_count(v, args.sample_fps) for v in videos)
+    with tqdm(total=total, unit='frame', desc='Analyzing') as progress:
+        try:
+            batch_analyzer.run_images(images, args.readers, progress)
+            for video in videos:
+                batch_analyzer.run_video(video, args.window, args.sample_fps, progress)
+        finally:
+            batch_analyzer.flush()
+            writer.close()
+            checkpoint.close()
+
+    print(f"Results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import logging
+import threading
+import time
+import numpy as np
+from room_detector import RoomDetector
+from frame_sources import ReconnectingCameraSource, open_frame_source
+
+logger = logging.getLogger(__name__)
+
+class DetectorManager:
+    """
+    Owns one RoomDetector and the thread and capture device it runs on.
+
+    The model is loaded (and warmed up) once, so start/stop/restart only
+    swap the capture and the loop thread. All lifecycle calls are serialized
+    by a lock and wait at most `join_timeout` seconds for the loop to exit.
+    The capture is only ever read and released on the loop thread; a stop
+    request just signals it, so a request thread never touches a device
+    that is in the middle of a read.
+    """
+
+    def __init__(self, detector=None, video_source=0, join_timeout=2.0, min_backoff=0.5, max_backoff=30.0,
+                 **detector_kwargs):
+        detector_kwargs.setdefault('display', False)
+        self.detector = detector if detector is not None else RoomDetector(**detector_kwargs)
+        self.video_source = video_source
+        self.join_timeout = join_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.source = None
+        self.callback = None
+        self.restarts = 0
+        self.last_restart_ms = None
+        self.warmup()
+
+    def warmup(self, shape=(480, 640, 3)):
+        """Run the model once on a blank frame so the first real frame doesn't pay for lazy initialization"""
+        self.detector.model(np.zeros(shape, dtype=np.uint8), conf=self.detector.confidence_threshold)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _open_source(self, video_source):
+        # Cameras and streams get their own stop event, so a stop request also ends a reconnect backoff
+        if isinstance(video_source, int) or (isinstance(video_source, str) and '://' in video_source):
+            return ReconnectingCameraSource(video_source, stop_event=self._stop_event,
+                                            min_backoff=self.min_backoff, max_backoff=self.max_backoff)
+        return open_frame_source(video_source)
+
+    def start(self, video_source=None, callback=None):
+        """Start detection on `video_source` (the last one used by default); returns False if it is already running"""
+        with self._lock:
+            if self.is_running():
+                return False
+
+            if video_source is not None:
+                self.video_source = video_source
+            if callback is not None:
+                self.callback = callback
+
+            # The detector sets its running flag before the thread starts, so an early stop can't be overwritten
+            self._stop_event = threading.Event()
+            self.source = self._open_source(self.video_source)
+            self.detector.start_detection(self.source, self.callback)
+            self._thread = self.detector.detection_thread
+            return True
+
+    def stop(self, timeout=None):
+        """
+        Signal the loop to stop and wait at most `timeout` (default join_timeout) seconds.
+        Returns whether it has exited; if not, it exits on its own once the pending read returns.
+        """
+        with self._lock:
+            if self._thread is None:
+                return True
+
+            self._stop_event.set()
+            if not self.detector.stop_detection(self.join_timeout if timeout is None else timeout):
+                logger.warning("Detection thread did not exit within the join timeout")
+                return False
+            self._thread = None
+            return True
+
+    def restart(self, video_source=None, callback=None):
+        """Stop and start again with the already loaded model; returns False if the old loop didn't exit in time"""
+        with self._lock:
+            started_at = time.perf_counter()
+            if not self.stop() or not self.start(video_source, callback):
+                return False
+            self.restarts += 1
+            self.last_restart_ms = (time.perf_counter() - started_at) * 1000
+            return True
+
+    def health(self):
+        """Lifecycle and capture state, for health checks"""
+        with self._lock:
+            thread_alive = self.is_running()
+            source = self.source
+            camera = isinstance(source, ReconnectingCameraSource)
+
+            if thread_alive and self._stop_event.is_set():
+                status = 'stopping'
+            elif thread_alive and camera and not source.connected:
+                status = 'reconnecting'
+            elif thread_alive:
+                status = 'running'
+            else:
+                status = 'error' if self.detector.last_error else 'stopped'
+
+            return {
+                'status': status,
+                'healthy': status in ('running', 'stopped'),
+                'video_source': self.video_source,
+                'thread_alive': thread_alive,
+                'camera_connected': source.connected if camera else None,
+                'reconnects': source.reconnects if camera else 0,
+                'last_frame_age': time.monotonic() - source.last_frame_time
+                if camera and source.last_frame_time is not None else None,
+                'fps': self.detector.fps,
+                'restarts': self.restarts,
+                'last_restart_ms': self.last_restart_ms,
+                'last_error': self.detector.last_error
+            }
@@ -0,0 +1,254 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS frames (
+    ts REAL NOT NULL,
+    person_count INTEGER,
+    object_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS frames_ts ON frames (ts);
+
+CREATE TABLE IF NOT EXISTS detections (
+    ts REAL NOT NULL,
+    class_id INTEGER NOT NULL,
+    track_id INTEGER NOT NULL,
+    confidence REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS detections_class_ts ON detections (class_id, ts);
+
+CREATE TABLE IF NOT EXISTS tracks (
+    track_id INTEGER NOT NULL,
+    class_id INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tracks_last_seen ON tracks (last_seen);
+
+CREATE TABLE IF NOT EXISTS labels (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    ts REAL NOT NULL,
+    room_type_id INTEGER,
+    warning_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analyses_ts ON analyses (ts);
+"""
+
+class DetectionEventLog:
+    """
+    Append-only log of the detections and room analyses of one camera.
+
+    Events are queued by the detection loop and written in batches by a
+    background thread into a per-camera SQLite file indexed on time, so
+    logging never blocks detection. If the writer falls behind by more than
+    `max_pending` events, new events are dropped and counted instead.
+
+    Person counts need to know which class id is a person. Unless
+    `person_class_id` is given, it is taken from the detector's model; for
+    models without a person class no person counts are stored.
+    """
+
+    def __init__(self, log_dir, camera_id='default', batch_size=500, flush_interval=1.0,
+                 max_pending=10000, person_class_id=None):
+        os.makedirs(log_dir, exist_ok=True)
+        self.path = os.path.join(log_dir, f"{camera_id}.db")
+        self.camera_id = camera_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.person_class_id = person_class_id
+        self._person_class_given = person_class_id is not None
+        self.dropped_events = 0
+
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+            self._label_ids = dict(conn.execute("SELECT name, id FROM labels"))
+
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        # WAL lets queries run while the writer appends
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def set_class_names(self, names):
+        """Pick the person class id from a model's id -> name map, unless one was given"""
+        if not self._person_class_given:
+            self.person_class_id = next((class_id for class_id, name in names.items() if name == 'person'), None)
+
+    def _enqueue(self, event):
+        try:
+            self._pending.put_nowait(event)
+        except queue.Full:
+            self.dropped_events += 1
+
+    def log_frame(self, timestamp, tracks):
+        """Record the tracked objects of one frame (see ObjectTracker.current_tracks)"""
+        self._enqueue(('frame', timestamp,
+                       [(track['class_id'], track['track_id'], track['confidence']) for track in tracks]))
+
+    def log_track(self, event):
+        """Record the lifetime of a track once it is lost"""
+        self._enqueue(('track', event['track_id'], event['class_id'], event['first_seen'], event['last_seen']))
+
+    def log_analysis(self, timestamp, analysis):
+        """Record the outcome of a room analysis"""
+        self._enqueue(('analysis', timestamp, analysis['room_type'], len(analysis['warnings'])))
+
+    def flush(self, timeout=None):
+        """Wait until everything queued so far is written; returns False if `timeout` ran out or the log is closed"""
+        if not self._writer.is_alive():
+            return False
+        written = threading.Event()
+        try:
+            self._pending.put(('flush', written), timeout=timeout)
+        except queue.Full:
+            return False
+        return written.wait(timeout)
+
+    def close(self):
+        """Flush everything queued so far and stop the writer"""
+        self._pending.put(None)
+        self._writer.join()
+
+    def _write_loop(self):
+        conn = self._connect()
+        running = True
+        flushed = []  # Events of flush() calls waiting on the current batch
+        while running:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._pending.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if event is None:
+                    running = False
+                    break
+                if event[0] == 'flush':
+                    flushed.append(event[1])
+                    break
+                batch.append(event)
+
+            if batch:
+                try:
+                    self._write_batch(conn, batch)
+                except sqlite3.Error as e:
+                    logger.error(f"Error writing detection events for {self.camera_id}: {str(e)}")
+            for written in flushed:
+                written.set()
+            flushed.clear()
+        conn.close()
+
+    def _label_id(self, conn, name):
+        if name not in self._label_ids:
+            conn.execute("INSERT OR IGNORE INTO labels (name) VALUES (?)", (name,))
+            self._label_ids[name] = conn.execute("SELECT id FROM labels WHERE name = ?", (name,)).fetchone()[0]
+        return self._label_ids[name]
+
+    def _write_batch(self, conn, batch):
+        frames, detections, tracks, analyses = [], [], [], []
+        for event in batch:
+            if event[0] == 'frame':
+                _, timestamp, objects = event
+                person_count = None if self.person_class_id is None else \
+                    sum(1 for class_id, _, _ in objects if class_id == self.person_class_id)
+                frames.append((timestamp, person_count, len(objects)))
+                detections.extend((timestamp, class_id, track_id, confidence)
+                                  for class_id, track_id, confidence in objects)
+            elif event[0] == 'track':
+                tracks.append(event[1:])
+            else:
+                _, timestamp, room_type, warning_count = event
+                room_type_id = self._label_id(conn, room_type) if room_type else None
+                analyses.append((timestamp, room_type_id, warning_count))
+
+        with conn:
+            conn.executemany("INSERT INTO frames VALUES (?, ?, ?)", frames)
+            conn.executemany("INSERT INTO detections VALUES (?, ?, ?, ?)", detections)
+            conn.executemany("INSERT INTO tracks VALUES (?, ?, ?, ?)", tracks)
+            conn.executemany("INSERT INTO analyses VALUES (?, ?, ?)", analyses)
+
+    def occupancy(self, start, end, bucket_seconds=60):
+        """Person counts over [start, end) aggregated into fixed-size time buckets (None without a person class)"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                """
+                SELECT CAST((ts - ?) / ? AS INTEGER) AS bucket,
+                       MAX(person_count), AVG(person_count), COUNT(*)
+                FROM frames WHERE ts >= ? AND ts < ?
+                GROUP BY bucket ORDER BY bucket
+                """,
+                (start, bucket_seconds, start, end)
+            ).fetchall()
+
+        return [{
+            'start': start + bucket * bucket_seconds,
+            'max_persons': max_persons,
+            'mean_persons': mean_persons,
+            'frames': frame_count
+        } for bucket, max_persons, mean_persons, frame_count in rows]
+
+    def object_presence(self, class_id, start, end, bucket_seconds=60):
+        """Fraction of frames in each time bucket in which `class_id` was detected"""
+        with closing(self._connect()) as conn:
+            frame_counts = dict(conn.execute(
+                """
+                SELECT CAST((ts - ?) / ? AS INTEGER) AS bucket, COUNT(*)
+                FROM frames WHERE ts >= ? AND ts < ?
+                GROUP BY bucket
+                """,
+                (start, bucket_seconds, start, end)
+            ))
+            present_counts = dict(conn.execute(
+                """
+                SELECT CAST((ts - ?) / ? AS INTEGER) AS bucket, COUNT(DISTINCT ts)
+                FROM detections WHERE class_id = ? AND ts >= ? AND ts < ?
+                GROUP BY bucket
+                """,
+                (start, bucket_seconds, class_id, start, end)
+            ))
+
+        return [{
+            'start': start + bucket * bucket_seconds,
+            'presence': present_counts.get(bucket, 0) / frame_count,
+            'frames': frame_count
+        } for bucket, frame_count in sorted(frame_counts.items())]
+
+    def track_lifetimes(self, start, end, class_id=None):
+        """Tracks that ended within [start, end) as (track_id, class_id, first_seen, last_seen)"""
+        query = "SELECT track_id, class_id, first_seen, last_seen FROM tracks WHERE last_seen >= ? AND last_seen < ?"
+        params = [start, end]
+        if class_id is not None:
+            query += " AND class_id = ?"
+            params.append(class_id)
+
+        with closing(self._connect()) as conn:
+            return conn.execute(query + " ORDER BY last_seen", params).fetchall()
+
+    def room_types(self, start, end):
+        """Room analyses over [start, end) as (timestamp, room_type) pairs"""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                """
+                SELECT analyses.ts, labels.name FROM analyses
+                LEFT JOIN labels ON labels.id = analyses.room_type_id
+                WHERE analyses.ts >= ? AND analyses.ts < ? ORDER BY analyses.ts
+                """,
+                (start, end)
+            ).fetchall()
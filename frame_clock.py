@@ -0,0 +1,38 @@
+import time
+
+class SystemClock:
+    """Wall-clock time, used for live cameras"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def on_frame(self, timestamp):
+        """Called with the source timestamp of every frame read (ignored for wall-clock time)"""
+        pass
+
+class ReplayClock:
+    """
+    Clock driven by the timestamps of a recorded source.
+
+    Time only moves when a frame is read, so FPS, analysis intervals and
+    suggestion cooldowns come out the same on every run no matter how fast
+    the frames are actually processed.
+    """
+
+    def __init__(self, start_time=0.0):
+        # Epoch time of the first frame of the recording
+        self.start_time = start_time
+        self.current_time = start_time
+
+    def time(self):
+        return self.current_time
+
+    def sleep(self, seconds):
+        # Virtual time belongs to the recording, waiting would only slow the replay down
+        pass
+
+    def on_frame(self, timestamp):
+        self.current_time = self.start_time + timestamp
@@ -0,0 +1,265 @@
+import cv2
+import numpy as np
+import os
+import queue
+import threading
+import time
+import logging
+from frame_clock import SystemClock, ReplayClock
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+class FrameSource:
+    """
+    Base class for everything RoomDetector can read frames from.
+
+    read() follows the cv2.VideoCapture contract and returns (ret, frame);
+    after a successful read, `timestamp` holds the position of that frame in
+    seconds from the start of the source. `continuous` is False for sources
+    whose consecutive frames are too far apart to track objects between them.
+    """
+
+    continuous = True
+
+    def __init__(self, clock=None, start_time=0.0):
+        # Epoch time of the first frame, so replays see the time of day they were recorded at
+        self.start_time = start_time
+        self.clock = clock if clock is not None else self.default_clock()
+        self.timestamp = None
+        self.frame_index = -1
+
+    def default_clock(self):
+        return ReplayClock(self.start_time)
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def _emit(self, frame, timestamp):
+        self.frame_index += 1
+        self.timestamp = timestamp
+        self.clock.on_frame(timestamp)
+        return True, frame
+
+class CameraSource(FrameSource):
+    """Live camera or network stream"""
+
+    def __init__(self, device=0, clock=None):
+        super().__init__(clock)
+        self.device = device
+        self.cap = cv2.VideoCapture(device)
+        self._opened_at = time.monotonic()
+
+    def default_clock(self):
+        return SystemClock()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret:
+            return False, None
+        return self._emit(frame, time.monotonic() - self._opened_at)
+
+    def release(self):
+        self.cap.release()
+
+class ReconnectingCameraSource(CameraSource):
+    """
+    Live camera that reopens the device with exponential backoff when it stops
+    delivering frames, so an unplugged USB camera or a dropped stream doesn't
+    end the detection loop. The device is opened on the first read, i.e. on the
+    thread that reads and releases it, and read() only returns (False, None)
+    once `stop_event` is set.
+    """
+
+    def __init__(self, device=0, clock=None, stop_event=None, min_backoff=0.5, max_backoff=30.0):
+        FrameSource.__init__(self, clock)
+        self.device = device
+        self.cap = None
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.reconnects = 0
+        self.last_frame_time = None
+        self._opened_at = time.monotonic()
+
+    def read(self):
+        backoff = self.min_backoff
+        while not self.stop_event.is_set():
+            if self.cap is None:
+                self.cap = cv2.VideoCapture(self.device)
+            ret, frame = self.cap.read()
+            if ret:
+                self.connected = True
+                self.last_frame_time = time.monotonic()
+                return self._emit(frame, self.last_frame_time - self._opened_at)
+
+            if self.connected:
+                logger.warning(f"Lost camera {self.device}, reconnecting")
+            self.connected = False
+            self.release()
+
+            # Waiting on the stop event lets a stop request cut the backoff short
+            if self.stop_event.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.max_backoff)
+            self.reconnects += 1
+        return False, None
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class VideoFileSource(FrameSource):
+    """
+    Video file decoded on a read-ahead thread so decoding overlaps with inference.
+    With sample_fps set, only that many frames per second are decoded and returned.
+    """
+
+    def __init__(self, path, clock=None, queue_size=64, sample_fps=None, start_time=None):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video file: {path}")
+
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        if start_time is None:
+            # The file is last written when the recording ends
+            duration = self.cap.get(cv2.CAP_PROP_FRAME_COUNT) / self.fps
+            start_time = os.path.getmtime(path) - duration
+        super().__init__(clock, start_time)
+        self.frame_step = max(1, round(self.fps / sample_fps)) if sample_fps else 1
+        self._frames = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._reader = threading.Thread(target=self._read_ahead, daemon=True)
+        self._reader.start()
+
+    def _read_ahead(self):
+        index = 0
+        while not self._stopped.is_set():
+            # Skipped frames are only grabbed: still decoded by FFmpeg, but not converted to BGR and copied out
+            if index % self.frame_step:
+                if not self.cap.grab():
+                    break
+                index += 1
+                continue
+
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+
+            # Timestamps come from the frame index; CAP_PROP_POS_MSEC is unreliable for some codecs
+            item = (frame, index / self.fps)
+            index += 1
+            while not self._stopped.is_set():
+                try:
+                    self._frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+
+        self.cap.release()
+        self._frames.put(None)
+
+    def read(self):
+        if self._stopped.is_set():
+            return False, None
+
+        item = self._frames.get()
+        if item is None:
+            self._stopped.set()
+            return False, None
+        return self._emit(*item)
+
+    def release(self):
+        self._stopped.set()
+        # Unblock the reader if it is waiting on a full queue
+        while self._reader.is_alive():
+            try:
+                self._frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+class ImageDirectorySource(FrameSource):
+    """Directory of still images, read in file-name order at a fixed virtual frame rate"""
+
+    continuous = False  # Snapshots can be minutes apart
+
+    def __init__(self, path, fps=1.0, clock=None, start_time=None):
+        self.path = path
+        self.fps = fps
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if start_time is None:
+            start_time = os.path.getmtime(self.files[0] if self.files else path)
+        super().__init__(clock, start_time)
+        self._position = 0
+
+    def read(self):
+        while self._position < len(self.files):
+            file_path = self.files[self._position]
+            timestamp = self._position / self.fps
+            self._position += 1
+
+            frame = cv2.imread(file_path)
+            if frame is None:
+                logger.warning(f"Skipping unreadable image: {file_path}")
+                continue
+            return self._emit(frame, timestamp)
+        return False, None
+
+class MemmapSource(FrameSource):
+    """
+    Pre-decoded frames stored as a (N, H, W, 3) uint8 .npy array.
+    The array is memory-mapped, so only the frames being read are paged in.
+    """
+
+    def __init__(self, path, fps=30.0, clock=None, start_time=None):
+        self.path = path
+        self.fps = fps
+        self.frames = np.load(path, mmap_mode='r')
+        if self.frames.ndim != 4:
+            raise ValueError(f"Expected a (N, H, W, C) frame array in {path}, got shape {self.frames.shape}")
+        if start_time is None:
+            start_time = os.path.getmtime(path) - len(self.frames) / fps
+        super().__init__(clock, start_time)
+        self._position = 0
+
+    def read(self):
+        if self._position >= len(self.frames):
+            return False, None
+
+        # Copy out of the read-only map, detections are drawn onto the frame
+        frame = np.array(self.frames[self._position])
+        timestamp = self._position / self.fps
+        self._position += 1
+        return self._emit(frame, timestamp)
+
+def open_frame_source(video_source, clock=None, start_time=None):
+    """
+    Build a frame source from what the user passed in: a camera index, a video
+    file or stream URL, a directory of images, a .npy file of frames, or an
+    existing FrameSource.
+
+    start_time is the epoch time a recording started at; by default it is
+    derived from the modification time of the file(s). Live sources ignore it.
+    """
+    if isinstance(video_source, FrameSource):
+        return video_source
+    if isinstance(video_source, int):
+        return CameraSource(video_source, clock=clock)
+    if os.path.isdir(video_source):
+        return ImageDirectorySource(video_source, clock=clock, start_time=start_time)
+    if video_source.lower().endswith('.npy'):
+        return MemmapSource(video_source, clock=clock, start_time=start_time)
+    if os.path.isfile(video_source):
+        return VideoFileSource(video_source, clock=clock, start_time=start_time)
+    # Anything else (rtsp://, http://, device paths) is handed to OpenCV as a live stream
+    return CameraSource(video_source, clock=clock)
@@ -0,0 +1,109 @@
+import cv2
+import numpy as np
+
+class MotionGate:
+    """
+    Low-power idle mode for the detection loop.
+
+    While people are around the gate stays ACTIVE and every frame goes
+    through the model. After `idle_after` seconds without a person it
+    switches to IDLE: frames are captured at `idle_fps` only, and the model
+    runs only when a cheap frame difference on a downscaled grayscale copy
+    shows motion for `wake_motion_frames` captured frames in a row, or when
+    `heartbeat` seconds have passed since the last inference. Seeing one of
+    `presence_classes` switches back to ACTIVE. Models that know none of them
+    (e.g. the custom furniture model) would see furniture in every frame, so
+    for those, activity counts as presence instead: sustained motion, or
+    objects appearing or disappearing between frames.
+    """
+
+    ACTIVE = 'active'
+    IDLE = 'idle'
+
+    def __init__(self, idle_after=60.0, idle_fps=2.0, heartbeat=30.0, motion_threshold=0.01,
+                 pixel_threshold=25, wake_motion_frames=2, motion_size=(64, 48), presence_classes=('person',)):
+        self.idle_after = idle_after
+        self.idle_fps = idle_fps
+        self.heartbeat = heartbeat
+        self.motion_threshold = motion_threshold  # Fraction of changed pixels that counts as motion
+        self.pixel_threshold = pixel_threshold  # Gray-level change for a pixel to count as changed
+        self.wake_motion_frames = wake_motion_frames
+        self.motion_size = motion_size
+        self.presence_classes = set(presence_classes)
+        self.reset()
+
+    def reset(self, now=None):
+        self.state = self.ACTIVE
+        self.previous = None
+        self.motion_level = 0.0
+        self.motion_frames = 0
+        self.last_capture_time = None
+        self.last_inference_time = None
+        self.last_presence_time = now
+        self.frames_captured = 0
+        self.frames_inferred = 0
+        self.transitions = 0
+
+    @property
+    def capture_interval(self):
+        """Seconds between captured frames; 0 means every frame"""
+        return 1.0 / self.idle_fps if self.state == self.IDLE else 0.0
+
+    def should_capture(self, now):
+        """Whether a frame read at `now` should be looked at at all (frames in between are dropped while idle)"""
+        if self.last_capture_time is not None and now - self.last_capture_time < self.capture_interval:
+            return False
+        self.last_capture_time = now
+        self.frames_captured += 1
+        return True
+
+    def _measure_motion(self, frame):
+        small = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), self.motion_size, interpolation=cv2.INTER_AREA)
+        previous, self.previous = self.previous, small
+        if previous is None:
+            return 1.0
+        return float(np.count_nonzero(cv2.absdiff(small, previous) > self.pixel_threshold)) / small.size
+
+    def should_infer(self, frame, now):
+        """Whether the model should run on a captured frame"""
+        self.motion_level = self._measure_motion(frame)
+        self.motion_frames = self.motion_frames + 1 if self.motion_level >= self.motion_threshold else 0
+
+        if self.state == self.ACTIVE or self.last_inference_time is None:
+            return True
+        if self.motion_frames >= self.wake_motion_frames:
+            return True
+        return now - self.last_inference_time >= self.heartbeat
+
+    def is_present(self, class_ids, names, tracks_changed=False):
+        """
+        Whether the detected class ids (names: the model's id -> name map) show someone in the room.
+        tracks_changed tells whether tracked objects appeared or disappeared in this frame.
+        """
+        if not self.presence_classes & set(names.values()):
+            return tracks_changed or self.motion_frames >= self.wake_motion_frames
+        return any(names[c] in self.presence_classes for c in class_ids)
+
+    def record_inference(self, now, present):
+        """Update the power state after the model ran on a frame"""
+        self.last_inference_time = now
+        self.frames_inferred += 1
+        if present or self.last_presence_time is None:
+            self.last_presence_time = now
+
+        if present and self.state == self.IDLE:
+            self.state = self.ACTIVE
+            self.transitions += 1
+        elif self.state == self.ACTIVE and now - self.last_presence_time >= self.idle_after:
+            self.state = self.IDLE
+            self.transitions += 1
+
+    def get_metrics(self):
+        return {
+            'power_state': self.state,
+            'motion_level': self.motion_level,
+            'frames_captured': self.frames_captured,
+            'frames_inferred': self.frames_inferred,
+            'inference_ratio': self.frames_inferred / self.frames_captured if self.frames_captured else 0.0,
+            'power_transitions': self.transitions
+        }
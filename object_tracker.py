@@ -0,0 +1,225 @@
+import numpy as np
+from collections import Counter
+
+# Constant-velocity model over [cx, cy, area, aspect ratio, vcx, vcy, varea] (as in SORT)
+STATE_DIM = 7
+MEASUREMENT_DIM = 4
+
+_F = np.eye(STATE_DIM)
+_F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+_H = np.eye(MEASUREMENT_DIM, STATE_DIM)
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 10000.0, 10000.0, 10000.0])
+
+def boxes_to_measurements(boxes):
+    """(N, 4) x1y1x2y2 boxes to (N, 4) [cx, cy, area, aspect ratio]"""
+    widths = boxes[:, 2] - boxes[:, 0]
+    heights = boxes[:, 3] - boxes[:, 1]
+    return np.stack([
+        boxes[:, 0] + widths / 2,
+        boxes[:, 1] + heights / 2,
+        widths * heights,
+        widths / np.maximum(heights, 1e-6)
+    ], axis=1)
+
+def states_to_boxes(states):
+    """(N, 7) filter states back to (N, 4) x1y1x2y2 boxes"""
+    areas = np.maximum(states[:, 2], 1e-6)
+    widths = np.sqrt(areas * np.maximum(states[:, 3], 1e-6))
+    heights = areas / widths
+    return np.stack([
+        states[:, 0] - widths / 2,
+        states[:, 1] - heights / 2,
+        states[:, 0] + widths / 2,
+        states[:, 1] + heights / 2
+    ], axis=1)
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between (N, 4) and (M, 4) x1y1x2y2 boxes"""
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return intersection / np.maximum(union, 1e-6)
+
+def greedy_assignment(scores, threshold):
+    """Match rows to columns by descending score, each at most once; returns (rows, cols)"""
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+
+    matched_rows, matched_cols = [], []
+    used_rows, used_cols = set(), set()
+    for row, col in zip(rows[order], cols[order]):
+        if row in used_rows or col in used_cols:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matched_rows.append(row)
+        matched_cols.append(col)
+    return np.array(matched_rows, dtype=int), np.array(matched_cols, dtype=int)
+
+class ObjectTracker:
+    """
+    SORT-style multi-object tracker.
+
+    Every track carries a Kalman filter; the filters of all tracks are
+    stored as stacked arrays and predicted/updated together. Detections are
+    matched to the predicted boxes of tracks of the same class by IoU, so
+    each physical object keeps a stable track id across frames.
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=15, min_hits=2):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age  # Frames a track survives without a matching detection
+        self.min_hits = min_hits  # Matches needed before a track is reported
+
+        self.states = np.zeros((0, STATE_DIM))
+        self.covariances = np.zeros((0, STATE_DIM, STATE_DIM))
+        self.track_ids = np.zeros(0, dtype=int)
+        self.class_ids = np.zeros(0, dtype=int)
+        self.confidences = np.zeros(0)
+        self.hits = np.zeros(0, dtype=int)
+        self.misses = np.zeros(0, dtype=int)  # Consecutive frames without a match
+        self.first_seen = np.zeros(0)
+        self.last_seen = np.zeros(0)
+
+        self.next_track_id = 1
+        self.events = []  # Track events ('new' / 'lost') of the last update
+        self.changed = False  # Whether the set of confirmed tracks changed in the last update
+
+    def _predict(self):
+        # Keep the predicted area positive
+        shrinking = self.states[:, 2] + self.states[:, 6] <= 0
+        self.states[shrinking, 6] = 0.0
+
+        self.states = self.states @ _F.T
+        self.covariances = _F @ self.covariances @ _F.T + _Q
+
+    def _correct(self, indices, measurements):
+        P = self.covariances[indices]
+        S = _H @ P @ _H.T + _R
+        K = P @ _H.T @ np.linalg.inv(S)
+        residuals = measurements - self.states[indices] @ _H.T
+        self.states[indices] += np.einsum('nij,nj->ni', K, residuals)
+        self.covariances[indices] = (np.eye(STATE_DIM) - K @ _H) @ P
+
+    def _track_event(self, event_type, index):
+        return {
+            'type': event_type,
+            'track_id': int(self.track_ids[index]),
+            'class_id': int(self.class_ids[index]),
+            'first_seen': float(self.first_seen[index]),
+            'last_seen': float(self.last_seen[index])
+        }
+
+    def update(self, boxes, class_ids, confidences, timestamp, confirm=False):
+        """
+        Advance the tracker by one frame.
+
+        boxes: (N, 4) x1y1x2y2 detections, class_ids: (N,), confidences: (N,)
+        confirm: confirm new tracks right away instead of after min_hits matches,
+        for frames without a usable predecessor (the first frame, unrelated snapshots)
+        Returns the confirmed tracks matched in this frame.
+        """
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        class_ids = np.asarray(class_ids, dtype=int).reshape(-1)
+        confidences = np.asarray(confidences, dtype=float).reshape(-1)
+        self.events = []
+        confirmed_before = set(self.track_ids[self.hits >= self.min_hits].tolist())
+
+        if len(self.states):
+            self._predict()
+
+        # Associate detections with tracks of the same class
+        ious = iou_matrix(states_to_boxes(self.states), boxes)
+        ious[self.class_ids[:, None] != class_ids[None, :]] = 0.0
+        track_idx, det_idx = greedy_assignment(ious, self.iou_threshold)
+
+        if len(track_idx):
+            self._correct(track_idx, boxes_to_measurements(boxes[det_idx]))
+            self.confidences[track_idx] = confidences[det_idx]
+            self.hits[track_idx] += 1
+            self.last_seen[track_idx] = timestamp
+        self.misses += 1
+        self.misses[track_idx] = 0
+
+        for index in np.nonzero((self.hits == self.min_hits) & (self.misses == 0))[0]:
+            if self.track_ids[index] not in confirmed_before:
+                self.events.append(self._track_event('new', index))
+
+        # Drop tracks that have not been matched for too long
+        expired = self.misses > self.max_age
+        for index in np.nonzero(expired & (self.hits >= self.min_hits))[0]:
+            self.events.append(self._track_event('lost', index))
+        self._keep(~expired)
+
+        # Start tentative tracks for unmatched detections
+        unmatched = np.setdiff1d(np.arange(len(boxes)), det_idx)
+        if len(unmatched):
+            self._spawn(boxes[unmatched], class_ids[unmatched], confidences[unmatched], timestamp,
+                        self.min_hits if confirm else 1)
+            if confirm or self.min_hits <= 1:
+                for index in range(len(self.track_ids) - len(unmatched), len(self.track_ids)):
+                    self.events.append(self._track_event('new', index))
+
+        self.changed = bool(self.events)
+        return self.current_tracks()
+
+    def _keep(self, mask):
+        self.states = self.states[mask]
+        self.covariances = self.covariances[mask]
+        self.track_ids = self.track_ids[mask]
+        self.class_ids = self.class_ids[mask]
+        self.confidences = self.confidences[mask]
+        self.hits = self.hits[mask]
+        self.misses = self.misses[mask]
+        self.first_seen = self.first_seen[mask]
+        self.last_seen = self.last_seen[mask]
+
+    def _spawn(self, boxes, class_ids, confidences, timestamp, hits=1):
+        count = len(boxes)
+        states = np.zeros((count, STATE_DIM))
+        states[:, :MEASUREMENT_DIM] = boxes_to_measurements(boxes)
+
+        self.states = np.concatenate([self.states, states])
+        self.covariances = np.concatenate([self.covariances, np.repeat(_P0[None], count, axis=0)])
+        self.track_ids = np.concatenate([self.track_ids, np.arange(self.next_track_id, self.next_track_id + count)])
+        self.class_ids = np.concatenate([self.class_ids, class_ids])
+        self.confidences = np.concatenate([self.confidences, confidences])
+        self.hits = np.concatenate([self.hits, np.full(count, max(hits, 1), dtype=int)])
+        self.misses = np.concatenate([self.misses, np.zeros(count, dtype=int)])
+        self.first_seen = np.concatenate([self.first_seen, np.full(count, timestamp, dtype=float)])
+        self.last_seen = np.concatenate([self.last_seen, np.full(count, timestamp, dtype=float)])
+        self.next_track_id += count
+
+    def current_tracks(self):
+        """Confirmed tracks matched in the latest frame"""
+        boxes = states_to_boxes(self.states)
+        return [{
+            'track_id': int(self.track_ids[index]),
+            'class_id': int(self.class_ids[index]),
+            'box': boxes[index],
+            'confidence': float(self.confidences[index]),
+            'lifetime': float(self.last_seen[index] - self.first_seen[index])
+        } for index in np.nonzero((self.hits >= self.min_hits) & (self.misses == 0))[0]]
+
+    def live_track_ids(self):
+        """Ids of every track still held, including ones missed in recent frames"""
+        return self.track_ids.tolist()
+
+    def instance_counts(self):
+        """Number of confirmed, currently visible instances per class id"""
+        visible = (self.hits >= self.min_hits) & (self.misses == 0)
+        return Counter(self.class_ids[visible].tolist())
+
+    def reset(self):
+        """Forget all tracks, e.g. when a run ends; confirmed ones are reported as 'lost' in `events`"""
+        self.events = [self._track_event('lost', index) for index in np.nonzero(self.hits >= self.min_hits)[0]]
+        self.changed = bool(self.events)
+        self._keep(np.zeros(len(self.track_ids), dtype=bool))
@@ -0,0 +1,279 @@
+import argparse
+import copy
+import json
+import random
+import shutil
+import time
+import cv2
+import numpy as np
+import torch
+import yaml
+from pathlib import Path
+from ultralytics import YOLO
+from train_model import ROOM_CLASSES
+
+# Room classes that go by a different name in the COCO label set
+COCO_ALIASES = {
+    'sofa': 'couch',
+    'table': 'dining table',
+    'plant': 'potted plant'
+}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+def letterbox(image, size):
+    """Resize keeping the aspect ratio and pad to size x size, as the YOLO predictor does"""
+    h, w = image.shape[:2]
+    ratio = size / max(h, w)
+    new_w, new_h = round(w * ratio), round(h * ratio)
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - new_h) // 2, (size - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    return canvas
+
+def sample_images(image_dir, count, seed=0):
+    """A reproducible random sample of the images in image_dir"""
+    files = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)
+    random.Random(seed).shuffle(files)
+    return files[:count]
+
+def dataset_images_dir(data_yaml, split):
+    """Images of a dataset split; split paths are relative to `path` unless they already start with it"""
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+    root = Path(data.get('path') or Path(data_yaml).parent)
+    split_dir = Path(data[split])
+    if not split_dir.is_absolute() and split_dir.parts[:len(root.parts)] != root.parts:
+        split_dir = root / split_dir
+    return split_dir / 'images'
+
+def prune_head(model, class_names):
+    """
+    Copy of `model` whose detection head only predicts `class_names`, in that order.
+
+    Classes the original model does not know get zeroed weights and a large
+    negative bias, so the label indices still line up with the dataset.
+    Returns None when the model already predicts exactly these classes.
+    """
+    names = model.names
+    if [names[i] for i in sorted(names)] == list(class_names):
+        return None
+
+    name_to_id = {name: i for i, name in names.items()}
+    keep = [name_to_id.get(name, name_to_id.get(COCO_ALIASES.get(name))) for name in class_names]
+
+    pruned_model = copy.deepcopy(model)
+    pruned = pruned_model.model
+    detect = pruned.model[-1]
+    for branch in detect.cv3:
+        conv = branch[-1]
+        weight = torch.zeros((len(keep),) + conv.weight.shape[1:], dtype=conv.weight.dtype)
+        bias = torch.full((len(keep),), -20.0, dtype=conv.bias.dtype)
+        for new_id, old_id in enumerate(keep):
+            if old_id is not None:
+                weight[new_id] = conv.weight.data[old_id]
+                bias[new_id] = conv.bias.data[old_id]
+
+        new_conv = torch.nn.Conv2d(conv.in_channels, len(keep), conv.kernel_size, conv.stride, conv.padding)
+        new_conv.weight.data, new_conv.bias.data = weight, bias
+        branch[-1] = new_conv
+
+    detect.nc = len(keep)
+    detect.no = detect.nc + detect.reg_max * 4
+    pruned.names = dict(enumerate(class_names))
+    pruned.yaml['nc'] = detect.nc
+
+    missing = [name for name, old_id in zip(class_names, keep) if old_id is None]
+    if missing:
+        print(f"Classes not known to the base model (will never be predicted): {', '.join(missing)}")
+
+    return pruned_model
+
+def export_onnx(model, img_size, output_path):
+    """Export `model` to ONNX at a fixed input size"""
+    exported = model.export(format='onnx', imgsz=img_size, simplify=True, device='cpu')
+    shutil.move(exported, output_path)
+    return output_path
+
+class ImageCalibrationReader:
+    """Feeds letterboxed sample images to the ONNX Runtime static quantizer"""
+
+    def __init__(self, image_files, input_name, img_size):
+        self.image_files = list(image_files)
+        self.input_name = input_name
+        self.img_size = img_size
+        self._position = 0
+
+    def get_next(self):
+        while self._position < len(self.image_files):
+            image = cv2.imread(str(self.image_files[self._position]))
+            self._position += 1
+            if image is None:
+                continue
+            image = letterbox(image, self.img_size)[:, :, ::-1]  # BGR to RGB
+            tensor = np.ascontiguousarray(image.transpose(2, 0, 1), dtype=np.float32)[None] / 255.0
+            return {self.input_name: tensor}
+        return None
+
+    def rewind(self):
+        self._position = 0
+
+def quantize_int8(fp32_path, int8_path, calibration_images, img_size):
+    """Static INT8 post-training quantization, calibrated on sample room images"""
+    try:
+        import onnx
+        import onnxruntime
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    except ImportError:
+        raise ImportError("INT8 quantization needs onnx and onnxruntime: pip install onnx onnxruntime")
+
+    input_name = onnxruntime.InferenceSession(str(fp32_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+    reader = ImageCalibrationReader(calibration_images, input_name, img_size)
+    quantize_static(
+        str(fp32_path), str(int8_path), reader,
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True
+    )
+
+    # Carry over the class names and image size the YOLO loader reads from the metadata
+    fp32_model, int8_model = onnx.load(str(fp32_path)), onnx.load(str(int8_path))
+    del int8_model.metadata_props[:]
+    int8_model.metadata_props.extend(fp32_model.metadata_props)
+    onnx.save(int8_model, str(int8_path))
+    return int8_path
+
+def measure_latency(model_path, image_files, img_size, warmup=3):
+    """Median single-image inference latency in milliseconds (pre- and post-processing included)"""
+    model = YOLO(str(model_path), task='detect')
+    images = [cv2.imread(str(f)) for f in image_files]
+    images = [image for image in images if image is not None]
+
+    for image in images[:warmup]:
+        model(image, imgsz=img_size, device='cpu', verbose=False)
+
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        model(image, imgsz=img_size, device='cpu', verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def measure_accuracy(model_path, data_yaml, img_size):
+    """Recall, precision and mAP of the model on the validation split"""
+    model = YOLO(str(model_path), task='detect')
+    metrics = model.val(data=str(data_yaml), imgsz=img_size, batch=1, device='cpu', plots=False, verbose=False)
+    return {
+        'recall': float(metrics.box.mr),
+        'precision': float(metrics.box.mp),
+        'map50': float(metrics.box.map50),
+        'map50_95': float(metrics.box.map)
+    }
+
+def write_report(results, output_dir, min_recall):
+    """Write the benchmark as JSON and as a Markdown table, and pick the fastest variant that meets min_recall"""
+    eligible = [r for r in results if r['recall'] >= min_recall]
+    recommended = min(eligible, key=lambda r: r['latency_ms']) if eligible else None
+
+    report = {
+        'min_recall': min_recall,
+        'recommended': recommended['variant'] if recommended else None,
+        'variants': results
+    }
+    with open(output_dir / 'report.json', 'w') as f:
+        json.dump(report, f, indent=2)
+
+    lines = [
+        '| Variant | Input | Latency (ms) | Recall | Precision | mAP50 | mAP50-95 | Size (MB) |',
+        '|---|---|---|---|---|---|---|---|'
+    ]
+    for r in sorted(results, key=lambda r: r['latency_ms']):
+        marker = ' **(recommended)**' if recommended is r else ''
+        lines.append(
+            f"| {r['variant']}{marker} | {r['img_size']} | {r['latency_ms']:.1f} | {r['recall']:.3f} | "
+            f"{r['precision']:.3f} | {r['map50']:.3f} | {r['map50_95']:.3f} | {r['size_mb']:.1f} |"
+        )
+    if recommended is None:
+        lines.append(f"\nNo variant reaches the recall bar of {min_recall}.")
+    with open(output_dir / 'report.md', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    return recommended
+
+def optimize(model_path, data_yaml, output_dir, img_sizes, calibration_samples, benchmark_samples,
+             min_recall, int8=True, prune=True):
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = YOLO(model_path)
+    stem = Path(model_path).stem
+
+    calibration_images = sample_images(dataset_images_dir(data_yaml, 'train'), calibration_samples)
+    benchmark_images = sample_images(dataset_images_dir(data_yaml, 'val'), benchmark_samples, seed=1)
+    if not benchmark_images:
+        raise ValueError(f"No validation images found in {dataset_images_dir(data_yaml, 'val')}")
+
+    bases = [('full', model)]
+    if prune:
+        pruned = prune_head(model, ROOM_CLASSES)
+        if pruned is not None:
+            bases.append(('pruned', pruned))
+        else:
+            print("Model already predicts exactly the room classes, skipping head pruning")
+
+    # Build every variant: each base model at each input size, in FP32 and INT8
+    variants = [(f"{stem} (pytorch)", model_path, max(img_sizes))]
+    for base_name, base_model in bases:
+        for img_size in img_sizes:
+            name = f"{stem}_{base_name}_{img_size}"
+            print(f"Exporting {name}...")
+            fp32_path = export_onnx(base_model, img_size, output_dir / f"{name}.onnx")
+            variants.append((f"{name} fp32", fp32_path, img_size))
+
+            if int8:
+                print(f"Quantizing {name} to INT8 on {len(calibration_images)} calibration images...")
+                int8_path = quantize_int8(fp32_path, output_dir / f"{name}_int8.onnx", calibration_images, img_size)
+                variants.append((f"{name} int8", int8_path, img_size))
+
+    results = []
+    for variant, path, img_size in variants:
+        print(f"Benchmarking {variant}...")
+        result = {
+            'variant': variant,
+            'path': str(path),
+            'img_size': img_size,
+            'size_mb': Path(path).stat().st_size / 1e6,
+            'latency_ms': measure_latency(path, benchmark_images, img_size)
+        }
+        result.update(measure_accuracy(path, data_yaml, img_size))
+        results.append(result)
+
+    return write_report(results, output_dir, min_recall)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and benchmark CPU-optimized variants of a trained detector')
+    parser.add_argument('model', nargs='?', default='room_detector.pt', help='Trained model to optimize')
+    parser.add_argument('--data', default='dataset/dataset.yaml', help='Dataset YAML used for calibration and validation')
+    parser.add_argument('--output', default='optimized', help='Directory for the variants and the report')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[640, 480, 320], help='Input sizes to export')
+    parser.add_argument('--calibration-samples', type=int, default=200, help='Training images used for INT8 calibration')
+    parser.add_argument('--benchmark-samples', type=int, default=50, help='Validation images used for latency')
+    parser.add_argument('--min-recall', type=float, default=0.5, help='Recall bar for the recommended variant')
+    parser.add_argument('--no-int8', action='store_true', help='Skip INT8 quantization')
+    parser.add_argument('--no-prune', action='store_true', help='Skip class pruning of the detection head')
+    args = parser.parse_args()
+
+    recommended = optimize(args.model, args.data, args.output, args.sizes, args.calibration_samples,
+                           args.benchmark_samples, args.min_recall, int8=not args.no_int8, prune=not args.no_prune)
+
+    print(f"\nReport written to {Path(args.output) / 'report.md'}")
+    if recommended:
+        print(f"Fastest variant meeting recall >= {args.min_recall}: {recommended['variant']} "
+              f"({recommended['latency_ms']:.1f} ms, recall {recommended['recall']:.3f}) -> {recommended['path']}")
+    else:
+        print(f"No variant meets recall >= {args.min_recall}")
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,11 @@
-from collections import defaultdict
+from collections import Counter, defaultdict
 import time
+from frame_clock import SystemClock
 
 class RoomAnalyzer:
-    def __init__(self):
+    def __init__(self, clock=None):
+        # Time source for cooldowns and time-of-day rules; replays use the recording's clock
+        self.clock = clock if clock is not None else SystemClock()
         self.safety_items = {
             'fire extinguisher': 'Safety',
             'smoke detector': 'Safety',
@@ -56,13 +59,37 @@ class RoomAnalyzer:
             }
         }
         
+        # Suggestions for a person who stays in a named zone (see room_zones.py), dwell in seconds
+        self.zone_scenarios = {
+            'bed': {
+                'min_dwell': 900,
+                'suggestion': "You've been resting for a while. Would you like me to dim the lights?"
+            },
+            'desk': {
+                'min_dwell': 2700,
+                'suggestion': "You've been at your desk for a while. How about a short break?"
+            },
+            'couch': {
+                'min_dwell': 3600,
+                'suggestion': "You've been relaxing on the couch for a while. Would you like some entertainment suggestions?"
+            }
+        }
+        
         self.interaction_history = []
         self.last_suggestion_time = defaultdict(float)
         self.suggestion_cooldown = 300  # 5 minutes between similar suggestions
         
-    def analyze_room(self, detected_objects, confidence_scores=None):
-        """Analyze the room and generate personalized suggestions"""
-        current_time = time.time()
+    def analyze_room(self, detected_objects, confidence_scores=None, object_counts=None, zones=None):
+        """
+        Analyze the room and generate personalized suggestions.
+        detected_objects has one entry per object instance; object_counts
+        defaults to the number of entries per name. zones is the per-zone
+        occupancy from ZoneMap.update, if the camera has zones.
+        """
+        if object_counts is None:
+            object_counts = Counter(detected_objects)
+        
+        current_time = self.clock.time()
         suggestions = []
         warnings = []
         
@@ -82,6 +109,10 @@ class RoomAnalyzer:
         if time_suggestions:
             suggestions.extend(time_suggestions)
         
+        # Add suggestions for people staying in a zone
+        if zones:
+            suggestions.extend(self._get_zone_suggestions(zones, current_time))
+        
         # Record interaction
         self._record_interaction(detected_objects, suggestions, warnings)
         
@@ -89,7 +120,9 @@ class RoomAnalyzer:
             'room_type': room_type,
             'suggestions': suggestions,
             'warnings': warnings,
-            'detected_objects': detected_objects
+            'detected_objects': detected_objects,
+            'object_counts': dict(object_counts),
+            'zones': zones or {}
         }
     
     def _check_safety_items(self, detected_objects):
@@ -148,7 +181,7 @@ class RoomAnalyzer:
     def _get_time_based_suggestions(self, detected_objects):
         """Generate time-based suggestions"""
         suggestions = []
-        current_hour = time.localtime().tm_hour
+        current_hour = time.localtime(self.clock.time()).tm_hour
         
         if 6 <= current_hour < 12:
             if 'bed' in detected_objects:
@@ -165,10 +198,29 @@ class RoomAnalyzer:
         
         return suggestions
     
+    def _get_zone_suggestions(self, zones, current_time):
+        """Generate suggestions for people who have stayed in a zone long enough"""
+        suggestions = []
+        
+        for zone_name, zone in zones.items():
+            scenario = self.zone_scenarios.get(zone_name)
+            if not scenario:
+                continue
+            
+            person_dwell = max((d['seconds'] for d in zone['dwell'].values() if d['name'] == 'person'), default=0)
+            key = f"zone:{zone_name}"
+            last_time = self.last_suggestion_time.get(key)
+            if person_dwell >= scenario['min_dwell'] and \
+                    (last_time is None or current_time - last_time >= self.suggestion_cooldown):
+                suggestions.append(scenario['suggestion'])
+                self.last_suggestion_time[key] = current_time
+        
+        return suggestions
+    
     def _record_interaction(self, detected_objects, suggestions, warnings):
         """Record the interaction for future reference"""
         self.interaction_history.append({
-            'timestamp': time.time(),
+            'timestamp': self.clock.time(),
             'detected_objects': detected_objects,
             'suggestions': suggestions,
             'warnings': warnings
@@ -4,15 +4,20 @@ from ultralytics import YOLO
 import torch
 import time
 import threading
-from collections import defaultdict, deque
+from collections import Counter, defaultdict, deque
 import logging
 from room_analyzer import RoomAnalyzer
+from frame_sources import CameraSource, open_frame_source
+from object_tracker import ObjectTracker
+from room_zones import ZoneMap
+from motion_gate import MotionGate
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class RoomDetector:
-    def __init__(self, model_path='yolov8n.pt', confidence_threshold=0.5):
+    def __init__(self, model_path='yolov8n.pt', confidence_threshold=0.5, clock=None, display=True,
+                 event_log=None, tracker=None, zones=None, motion_gate=None):
         # Initialize YOLO model
         self.model = YOLO(model_path)
         self.confidence_threshold = confidence_threshold
@@ -72,6 +77,22 @@ class RoomDetector:
         
         self.detection_thread = None
         self.is_running = False
+        self.last_error = None  # Error that ended the last run, if any
+        self.display = display  # Show the annotated frames in an OpenCV window
+        self.clock = clock  # Defaults to the clock of the frame source (wall-clock for cameras)
+        self.source = None
+        self.event_log = event_log  # Optional DetectionEventLog that detections and analyses are persisted to
+        if event_log is not None:
+            event_log.set_class_names(self.model.names)
+        self.event_log_flush_timeout = 5.0  # seconds the end of a run waits for the event log
+        self.tracker = tracker if tracker is not None else ObjectTracker()
+        self.current_tracks = []
+        self.zones = zones if zones is not None else ZoneMap()  # Left / center / right thirds by default
+        # Without an explicit gate, idle mode only applies to live cameras so recordings are processed in full
+        self.motion_gate = motion_gate if motion_gate is not None else MotionGate()
+        self.gate_recordings = motion_gate is not None
+        self.motion_gate_enabled = False
+        self.object_counts = Counter()
         self.frame_buffer = deque(maxlen=30)  # 1 second buffer at 30 FPS
         self.last_analysis_time = 0
         self.analysis_interval = 5  # seconds between analyses
@@ -82,10 +103,14 @@ class RoomDetector:
         # Performance metrics
         self.fps = 0
         self.frame_count = 0
-        self.start_time = time.time()
+        self.start_time = 0
+        self.avg_processing_time = 0.0
         
     def start_detection(self, video_source=0, callback=None):
-        """Start the detection thread"""
+        """
+        Start the detection thread. video_source can be a camera index, a video
+        file or stream URL, a directory of images, a .npy file of frames or a FrameSource.
+        """
         if self.is_running:
             return
             
@@ -95,77 +120,210 @@ class RoomDetector:
         self.detection_thread.daemon = True
         self.detection_thread.start()
         
-    def stop_detection(self):
-        """Stop the detection thread"""
+    def run(self, video_source=0, callback=None):
+        """Run detection in the calling thread until the source is exhausted, e.g. to reprocess a recording"""
+        self.is_running = True
+        self.callback = callback
+        self._detection_loop(video_source)
+        
+    def stop_detection(self, timeout=None):
+        """Stop the detection thread, waiting at most `timeout` seconds; returns whether it has exited"""
         self.is_running = False
         if self.detection_thread:
-            self.detection_thread.join()
+            self.detection_thread.join(timeout)
+            return not self.detection_thread.is_alive()
+        return True
             
     def _detection_loop(self, video_source):
-        """Main detection loop"""
-        cap = cv2.VideoCapture(video_source)
+        """Main detection loop; whatever happens, the source is released on this thread and is_running cleared"""
+        self.last_error = None
+        source = None
+        try:
+            source = open_frame_source(video_source)
+            self.source = source
+            self._process_frames(source)
+        except Exception as e:
+            self.last_error = str(e)
+            raise
+        finally:
+            if source is not None:
+                source.release()
+            # Objects still tracked when the run ends get their lifetimes logged too
+            self.tracker.reset()
+            if self.event_log:
+                for event in self.tracker.events:
+                    self.event_log.log_track(event)
+                # The writer is a daemon thread, so make sure the end of the run reaches the database
+                if not self.event_log.flush(self.event_log_flush_timeout):
+                    logger.warning("Detection events could not be flushed; the log is closed or the writer is behind")
+            self.is_running = False
+            if self.display:
+                cv2.destroyAllWindows()
+            
+    def _process_frames(self, source):
+        """Detect, track and analyze frames until the source ends or detection is stopped"""
+        # Recordings run on their own timestamps unless a clock was injected
+        clock = self.clock if self.clock is not None else source.clock
+        source.clock = clock
+        self.room_analyzer.clock = clock
+        self.start_time = clock.time()
+        self.last_analysis_time = self.start_time - self.analysis_interval  # Analyze the first frame
+        self.tracker.reset()
+        self.zones.reset()
+        self.motion_gate.reset(self.start_time)
+        self.motion_gate_enabled = self.gate_recordings or isinstance(source, CameraSource)
+        gate = self.motion_gate if self.motion_gate_enabled else None
+        first_frame = True
         
         while self.is_running:
-            ret, frame = cap.read()
+            ret, frame = source.read()
             if not ret:
                 break
                 
+            current_time = clock.time()
+            
+            # While idle, frames are sampled at a low rate and the model only runs on motion or a heartbeat
+            if gate and not gate.should_capture(current_time):
+                continue
+            if gate and not gate.should_infer(frame, current_time):
+                self.frame_buffer.append(frame)
+                if not self._show(frame):
+                    break
+                clock.sleep(gate.capture_interval)
+                continue
+            
             # Run detection
+            inference_start = time.perf_counter()
             results = self.model(frame, conf=self.confidence_threshold)[0]
+            boxes = results.boxes.xyxy.cpu().numpy()
+            class_ids = results.boxes.cls.cpu().numpy().astype(int)
+            confidences = results.boxes.conf.cpu().numpy()
+            self.avg_processing_time = 0.9 * self.avg_processing_time + 0.1 * (time.perf_counter() - inference_start)
+            
+            # Follow objects across frames so each instance keeps its own id; with no previous
+            # frame to match against, detections are reported right away instead of after min_hits
+            confirm = first_frame or not source.continuous
+            first_frame = False
+            self.current_tracks = self.tracker.update(boxes, class_ids, confidences, current_time, confirm)
+            if gate:
+                gate.record_inference(current_time, gate.is_present(class_ids, results.names, self.tracker.changed))
             
-            # Process detections
+            # Process tracked objects
             detected_objects = []
             confidence_scores = {}
             
-            for box in results.boxes:
-                class_id = int(box.cls[0])
-                confidence = float(box.conf[0])
-                class_name = results.names[class_id]
+            for track in self.current_tracks:
+                class_name = results.names[track['class_id']]
+                confidence = track['confidence']
                 
                 # Map class name to indoor-specific name if available
                 mapped_name = self.indoor_mappings.get(class_name, class_name)
                 
                 detected_objects.append(mapped_name)
-                confidence_scores[mapped_name] = confidence
+                confidence_scores[mapped_name] = max(confidence, confidence_scores.get(mapped_name, 0.0))
                 
                 # Draw bounding box
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
+                x1, y1, x2, y2 = map(int, track['box'])
                 cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                cv2.putText(frame, f"{mapped_name} {confidence:.2f}", 
+                cv2.putText(frame, f"{mapped_name} #{track['track_id']} {confidence:.2f}", 
                           (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
             
+            object_counts = Counter(detected_objects)
+            self.object_counts = object_counts
+            zone_occupancy = self.zones.update(self.current_tracks, detected_objects, frame.shape, current_time,
+                                               self.tracker.live_track_ids())
+            
             # Update FPS
             self.frame_count += 1
-            if time.time() - self.start_time > 1:
+            if clock.time() - self.start_time > 1:
                 self.fps = self.frame_count
                 self.frame_count = 0
-                self.start_time = time.time()
+                self.start_time = clock.time()
             
             # Add frame to buffer
             self.frame_buffer.append(frame)
             
+            if self.event_log:
+                self.event_log.log_frame(current_time, self.current_tracks)
+                for event in self.tracker.events:
+                    if event['type'] == 'lost':
+                        self.event_log.log_track(event)
+            
             # Analyze room periodically
-            current_time = time.time()
             if current_time - self.last_analysis_time >= self.analysis_interval:
-                self.current_analysis = self.room_analyzer.analyze_room(detected_objects, confidence_scores)
+                self.current_analysis = self.room_analyzer.analyze_room(detected_objects, confidence_scores,
+                                                                        object_counts, zone_occupancy)
                 self.last_analysis_time = current_time
+                if self.event_log:
+                    self.event_log.log_analysis(current_time, self.current_analysis)
                 
                 if self.callback:
                     self.callback(self.current_analysis)
             
             # Display frame with FPS
             cv2.putText(frame, f"FPS: {self.fps}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            cv2.imshow('Room Detection', frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if not self._show(frame):
                 break
-                
-        cap.release()
-        cv2.destroyAllWindows()
+            
+            if gate:
+                clock.sleep(gate.capture_interval)
+        
+    def _show(self, frame):
+        """Display a frame if enabled; returns False once 'q' is pressed"""
+        if not self.display:
+            return True
+        cv2.imshow('Room Detection', frame)
+        return cv2.waitKey(1) & 0xFF != ord('q')
+        
+    def detect_batch(self, frames):
+        """
+        Run detection on a batch of frames without tracking or drawing.
+        Returns one list per frame of dicts with the mapped name, class id, confidence and box.
+        """
+        batch_detections = []
+        for results in self.model(frames, conf=self.confidence_threshold, verbose=False):
+            boxes = results.boxes.xyxy.cpu().numpy()
+            class_ids = results.boxes.cls.cpu().numpy().astype(int)
+            confidences = results.boxes.conf.cpu().numpy()
+            
+            detections = []
+            for box, class_id, confidence in zip(boxes, class_ids, confidences):
+                class_name = results.names[class_id]
+                detections.append({
+                    'name': self.indoor_mappings.get(class_name, class_name),
+                    'class_id': int(class_id),
+                    'confidence': float(confidence),
+                    'box': [float(v) for v in box]
+                })
+            batch_detections.append(detections)
+        return batch_detections
         
     def get_current_analysis(self):
         """Get the current room analysis"""
         return self.current_analysis
         
+    def get_room_analysis(self):
+        """Get the latest room analysis together with the zone occupancy of the latest frame"""
+        analysis = dict(self.current_analysis or {})
+        analysis['zones'] = self.zones.occupancy
+        analysis['layout'] = {'zones': self.zones.layout()}
+        return analysis
+        
+    def get_performance_metrics(self):
+        """Get FPS, inference time, current object counts and the power state of the idle mode"""
+        metrics = {
+            'fps': self.fps,
+            'avg_processing_time': self.avg_processing_time,
+            'detection_counts': dict(self.object_counts)
+        }
+        if self.motion_gate_enabled:
+            metrics.update(self.motion_gate.get_metrics())
+        return metrics
+        
+    def get_current_tracks(self):
+        """Get the confirmed object tracks of the latest frame"""
+        return self.current_tracks
+        
     def get_latest_frame(self):
         """Get the latest frame from the buffer"""
         return self.frame_buffer[-1] if self.frame_buffer else None
@@ -0,0 +1,107 @@
+import cv2
+import json
+import numpy as np
+from collections import Counter
+
+# Left / center / right thirds of the frame, as shown on the dashboard
+DEFAULT_ZONES = [
+    {'name': 'left', 'polygon': [[0, 0], [1 / 3, 0], [1 / 3, 1], [0, 1]]},
+    {'name': 'center', 'polygon': [[1 / 3, 0], [2 / 3, 0], [2 / 3, 1], [1 / 3, 1]]},
+    {'name': 'right', 'polygon': [[2 / 3, 0], [1, 0], [1, 1], [2 / 3, 1]]}
+]
+
+def load_zone_config(path, camera_id='default'):
+    """
+    Read the zones of one camera from a JSON file of the form
+    {"<camera_id>": [{"name": "bed", "polygon": [[x, y], ...]}, ...]}
+    with polygon coordinates relative to the frame size (0-1).
+    """
+    with open(path) as f:
+        config = json.load(f)
+    if camera_id not in config:
+        raise KeyError(f"No zones configured for camera '{camera_id}' in {path}")
+    return ZoneMap(config[camera_id])
+
+class ZoneMap:
+    """
+    Polygon zones of one camera, rasterized once into a label mask.
+
+    Objects are assigned to zones by looking up their anchor point in the
+    mask, which costs the same no matter how many zones there are. Where
+    zones overlap, the one listed last wins.
+    """
+
+    def __init__(self, zones=None, anchor='center'):
+        self.zones = zones if zones is not None else DEFAULT_ZONES
+        self.names = [zone['name'] for zone in self.zones]
+        self.anchor = anchor  # 'center' of the box, or 'bottom' center (where a person stands or sits)
+        self.mask = None
+        self.dwell_since = {}  # track id -> (zone index, time it entered the zone)
+        self.occupancy = self._empty_occupancy()
+
+    def _rasterize(self, height, width):
+        dtype = np.uint8 if len(self.zones) < 255 else np.uint16
+        mask = np.zeros((height, width), dtype=dtype)  # 0 means outside every zone
+        scale = np.array([width, height], dtype=float)
+        for index, zone in enumerate(self.zones):
+            points = np.round(np.array(zone['polygon'], dtype=float) * scale).astype(np.int32)
+            cv2.fillPoly(mask, [points], index + 1)
+        self.mask = mask
+
+    def assign(self, boxes, frame_shape):
+        """Zone index of each (N, 4) x1y1x2y2 box, -1 for boxes outside every zone"""
+        height, width = frame_shape[:2]
+        if self.mask is None or self.mask.shape != (height, width):
+            self._rasterize(height, width)
+
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        xs = (boxes[:, 0] + boxes[:, 2]) / 2
+        ys = boxes[:, 3] if self.anchor == 'bottom' else (boxes[:, 1] + boxes[:, 3]) / 2
+        xs = np.clip(xs.astype(int), 0, width - 1)
+        ys = np.clip(ys.astype(int), 0, height - 1)
+        return self.mask[ys, xs].astype(int) - 1
+
+    def _empty_occupancy(self):
+        return {name: {'objects': {}, 'count': 0, 'dwell': {}} for name in self.names}
+
+    def update(self, tracks, names, frame_shape, timestamp, live_track_ids=None):
+        """
+        Assign the tracks of a frame to zones and update how long each one has stayed in its zone.
+        live_track_ids are the ids the tracker still holds, including tracks missed in this
+        frame; those keep their dwell time. Returns per-zone object counts and dwell times
+        (seconds, by track id).
+        """
+        zone_ids = self.assign([track['box'] for track in tracks], frame_shape) if tracks else []
+
+        # Tracks missed for a few frames keep accumulating dwell time until the tracker drops them
+        live_track_ids = set(live_track_ids) if live_track_ids is not None else set()
+        dwell_since = {track_id: entry for track_id, entry in self.dwell_since.items() if track_id in live_track_ids}
+        counts = [Counter() for _ in self.zones]
+        occupancy = self._empty_occupancy()
+        for track, name, zone_id in zip(tracks, names, zone_ids):
+            track_id = track['track_id']
+            if zone_id < 0:
+                dwell_since.pop(track_id, None)
+                continue
+            previous = self.dwell_since.get(track_id)
+            since = previous[1] if previous and previous[0] == zone_id else timestamp
+            dwell_since[track_id] = (zone_id, since)
+
+            counts[zone_id][name] += 1
+            occupancy[self.names[zone_id]]['dwell'][track_id] = {'name': name, 'seconds': timestamp - since}
+
+        for zone_id, zone_counts in enumerate(counts):
+            occupancy[self.names[zone_id]]['objects'] = dict(zone_counts)
+            occupancy[self.names[zone_id]]['count'] = sum(zone_counts.values())
+
+        self.dwell_since = dwell_since
+        self.occupancy = occupancy
+        return occupancy
+
+    def layout(self):
+        """Object names per zone, as the dashboard displays them"""
+        return {name: sorted(zone['objects']) for name, zone in self.occupancy.items()}
+
+    def reset(self):
+        self.dwell_since = {}
+        self.occupancy = self._empty_occupancy()
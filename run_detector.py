@@ -1,4 +1,6 @@
 from room_detector import RoomDetector
+from frame_sources import open_frame_source
+from datetime import datetime
 import time
 import sys
 
@@ -11,8 +13,8 @@ def print_analysis(analysis):
     print(f"\nRoom Type: {analysis['room_type'].title() if analysis['room_type'] else 'Unknown'}")
     
     print("\nDetected Objects:")
-    for obj in analysis['detected_objects']:
-        print(f"- {obj}")
+    for obj, count in analysis['object_counts'].items():
+        print(f"- {obj}" + (f" x{count}" if count > 1 else ""))
     
     print("\nSuggestions:")
     for suggestion in analysis['suggestions']:
@@ -25,16 +27,32 @@ def print_analysis(analysis):
     
     print("\n" + "="*50)
 
+def parse_source(argv):
+    """Camera index by default; a video file, image folder or .npy of frames replays a recording"""
+    if len(argv) < 2:
+        return 0
+    return int(argv[1]) if argv[1].isdigit() else argv[1]
+
+def parse_start_time(argv):
+    """Optional recording start time (ISO format, local time); defaults to the file modification time"""
+    if len(argv) < 3:
+        return None
+    return datetime.fromisoformat(argv[2]).timestamp()
+
 def main():
+    video_source = parse_source(sys.argv)
+    start_time = parse_start_time(sys.argv)
+    
     print("Starting Room Detection System...")
     print("Press 'q' to quit")
-    print("Initializing camera...")
+    print("Initializing camera..." if isinstance(video_source, int) else f"Replaying {video_source}...")
     
     try:
         detector = RoomDetector()
-        detector.start_detection(callback=print_analysis)
+        source = open_frame_source(video_source, start_time=start_time)
+        detector.start_detection(video_source=source, callback=print_analysis)
         
-        while True:
+        while detector.is_running:
             time.sleep(0.1)
             
     except KeyboardInterrupt:
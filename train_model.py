@@ -1,9 +1,20 @@
 from ultralytics import YOLO
+import os
+import torch
 import yaml
 from pathlib import Path
+from training_cache import CachedDetectionTrainer
+
+RUN_DIR = Path('runs') / 'detect' / 'room_detector'
+
+# Classes of the custom room dataset, in label index order
+ROOM_CLASSES = [
+    'chair', 'table', 'bed', 'sofa', 'tv', 'lamp', 'desk',
+    'bookshelf', 'plant', 'clock', 'picture', 'window', 'door'
+]
 
 def create_dataset_yaml(data_dir, train_dir, val_dir, classes):
-    """Create YAML configuration file for the dataset"""
+    """Create YAML configuration file for the dataset (left untouched if it is already up to date)"""
     yaml_data = {
         'path': str(data_dir),
         'train': str(train_dir),
@@ -12,25 +23,67 @@ def create_dataset_yaml(data_dir, train_dir, val_dir, classes):
     }
     
     yaml_path = data_dir / 'dataset.yaml'
+    if yaml_path.exists():
+        with open(yaml_path) as f:
+            if yaml.safe_load(f) == yaml_data:
+                return yaml_path
+    
     with open(yaml_path, 'w') as f:
         yaml.dump(yaml_data, f)
     
     return yaml_path
 
-def train_model(data_yaml, epochs=100, batch_size=16, img_size=640):
+def select_device():
+    """Train on the first GPU when CUDA is available, otherwise on the CPU"""
+    return '0' if torch.cuda.is_available() else 'cpu'
+
+def default_workers():
+    """Dataloader processes sized to the host, leaving one core for the training loop"""
+    return max(1, min(8, (os.cpu_count() or 1) - 1))
+
+def resumable_checkpoint(run_dir=RUN_DIR):
+    """Last checkpoint of an interrupted run in run_dir, if there is one"""
+    last = run_dir / 'weights' / 'last.pt'
+    if not last.exists():
+        return None
+    
+    # Checkpoints of finished runs are stripped of their optimizer state and marked with epoch -1
+    checkpoint = torch.load(last, map_location='cpu')
+    return last if checkpoint.get('epoch', -1) != -1 else None
+
+def train_model(data_yaml, epochs=100, batch_size=16, img_size=640, device=None, workers=None, resume=True):
     """Train YOLOv8 model on custom dataset"""
+    device = device if device is not None else select_device()
+    workers = workers if workers is not None else default_workers()
+    
+    # Decoded images are cached in a memory-mapped store next to the dataset
+    CachedDetectionTrainer.cache_root = Path(data_yaml).parent / '.cache'
+    CachedDetectionTrainer.cache_workers = workers
+    
+    checkpoint = resumable_checkpoint() if resume else None
+    if checkpoint:
+        print(f"Resuming interrupted training from {checkpoint}")
+        model = YOLO(str(checkpoint))
+        model.train(trainer=CachedDetectionTrainer, resume=True)
+        return model
+    
     # Initialize model
     model = YOLO('yolov8n.pt')  # Load pretrained model
     
     # Train the model
     results = model.train(
+        trainer=CachedDetectionTrainer,
         data=str(data_yaml),
         epochs=epochs,
         batch=batch_size,
         imgsz=img_size,
         patience=50,  # Early stopping patience
         save=True,    # Save best model
-        device='0'    # Use GPU if available
+        device=device,
+        workers=workers,
+        project=str(RUN_DIR.parent),
+        name=RUN_DIR.name,
+        exist_ok=True  # Keep one run directory so interrupted runs can be resumed
     )
     
     return model
@@ -41,17 +94,11 @@ if __name__ == "__main__":
     train_dir = data_dir / 'train'
     val_dir = data_dir / 'val'
     
-    # Define your classes
-    classes = [
-        'chair', 'table', 'bed', 'sofa', 'tv', 'lamp', 'desk',
-        'bookshelf', 'plant', 'clock', 'picture', 'window', 'door'
-    ]
-    
     # Create dataset YAML
-    yaml_path = create_dataset_yaml(data_dir, train_dir, val_dir, classes)
+    yaml_path = create_dataset_yaml(data_dir, train_dir, val_dir, ROOM_CLASSES)
     
     # Train model
     model = train_model(yaml_path)
     
     # Save the trained model
-    model.save('room_detector.pt') 
\ No newline at end of file
+    model.save('room_detector.pt')
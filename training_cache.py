@@ -0,0 +1,137 @@
+import cv2
+import hashlib
+import json
+import numpy as np
+import os
+from multiprocessing import Pool
+from pathlib import Path
+from ultralytics.data import YOLODataset
+from ultralytics.models.yolo.detect import DetectionTrainer
+
+def files_fingerprint(files, *extra):
+    """Hash of the paths, sizes and modification times of `files`, changes whenever one of them does"""
+    digest = hashlib.sha1()
+    for item in extra:
+        digest.update(str(item).encode())
+    for file_path in files:
+        stat = os.stat(file_path)
+        digest.update(f"{file_path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+def _resize_to(file_path, img_size):
+    image = cv2.imread(str(file_path))
+    if image is None:
+        raise IOError(f"Could not read image: {file_path}")
+    h0, w0 = image.shape[:2]
+    ratio = img_size / max(h0, w0)
+    if ratio != 1:
+        interpolation = cv2.INTER_LINEAR if ratio > 1 else cv2.INTER_AREA
+        image = cv2.resize(image, (min(img_size, round(w0 * ratio)), min(img_size, round(h0 * ratio))),
+                           interpolation=interpolation)
+    return image, (h0, w0)
+
+def _cache_worker(args):
+    store_path, index, file_path, img_size = args
+    image, original_shape = _resize_to(file_path, img_size)
+    store = np.load(store_path, mmap_mode='r+')
+    h, w = image.shape[:2]
+    store[index, :h, :w] = image
+    store.flush()
+    return index, original_shape, (h, w)
+
+class ImageCache:
+    """
+    Decoded training images, resized so the long side is `img_size` and
+    padded into a single (N, img_size, img_size, 3) memory-mapped array.
+
+    The cache is rebuilt only when the fingerprint of the image files or the
+    image size changes, so later runs skip JPEG decoding and resizing.
+    """
+
+    def __init__(self, cache_dir, image_files, img_size):
+        self.image_files = [str(f) for f in image_files]
+        self.img_size = img_size
+        self.fingerprint = files_fingerprint(self.image_files, img_size)
+        self.cache_dir = Path(cache_dir)
+        self.store_path = self.cache_dir / f"images_{img_size}.npy"
+        self.manifest_path = self.cache_dir / f"images_{img_size}.json"
+        self.shapes = None
+        self._store = None
+
+    def is_current(self):
+        if not (self.store_path.exists() and self.manifest_path.exists()):
+            return False
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('fingerprint') != self.fingerprint:
+            return False
+        self.shapes = manifest['shapes']
+        return True
+
+    def build(self, workers=1):
+        """Decode every image into the store unless the existing cache is still current"""
+        if self.is_current():
+            print(f"Using cached images in {self.store_path}")
+            return
+
+        print(f"Caching {len(self.image_files)} images to {self.store_path}...")
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.manifest_path.unlink(missing_ok=True)
+        store = np.lib.format.open_memmap(self.store_path, mode='w+', dtype=np.uint8,
+                                          shape=(len(self.image_files), self.img_size, self.img_size, 3))
+        del store
+
+        self.shapes = [None] * len(self.image_files)
+        jobs = [(str(self.store_path), i, f, self.img_size) for i, f in enumerate(self.image_files)]
+        with Pool(max(1, workers)) as pool:
+            for index, original_shape, resized_shape in pool.imap_unordered(_cache_worker, jobs, chunksize=16):
+                self.shapes[index] = [list(original_shape), list(resized_shape)]
+
+        # The manifest is written last, so an interrupted build is redone on the next run
+        with open(self.manifest_path, 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'shapes': self.shapes}, f)
+
+    def load(self, index):
+        """(image, original (h, w), resized (h, w)) for image `index`, same as BaseDataset.load_image"""
+        if self._store is None:
+            self._store = np.load(self.store_path, mmap_mode='r')
+        (h0, w0), (h, w) = self.shapes[index]
+        return np.array(self._store[index, :h, :w]), (h0, w0), (h, w)
+
+    def __getstate__(self):
+        # Dataloader workers reopen the map instead of receiving a pickled copy of it
+        state = self.__dict__.copy()
+        state['_store'] = None
+        return state
+
+class CachedYOLODataset(YOLODataset):
+    """YOLODataset that reads its images from an ImageCache"""
+
+    def load_image(self, i, rect_mode=True):
+        if not rect_mode:
+            return super().load_image(i, rect_mode)
+
+        image, original_shape, resized_shape = self.image_cache.load(i)
+        if self.augment:
+            # Mosaic picks its companion images from the buffer of recently loaded ones
+            self.buffer.append(i)
+            if len(self.buffer) >= self.max_buffer_length:
+                self.buffer.pop(0)
+        return image, original_shape, resized_shape
+
+class CachedDetectionTrainer(DetectionTrainer):
+    """DetectionTrainer whose datasets are backed by memory-mapped image caches"""
+
+    cache_root = Path('dataset') / '.cache'
+    cache_workers = 1
+
+    def build_dataset(self, img_path, mode='train', batch=None):
+        dataset = super().build_dataset(img_path, mode, batch)
+
+        cache_dir = self.cache_root / hashlib.sha1(str(img_path).encode()).hexdigest()[:12]
+        image_cache = ImageCache(cache_dir, dataset.im_files, dataset.imgsz)
+        image_cache.build(self.cache_workers)
+
+        dataset.__class__ = CachedYOLODataset
+        dataset.image_cache = image_cache
+        return dataset